@@ -2,9 +2,9 @@ from __future__ import annotations
 
 import argparse
 import sys
-import time
 
-import serial
+from switchctl import controller
+from switchctl import inputs
 
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
@@ -12,17 +12,37 @@ SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--daemon', action='store_true')
+    parser.add_argument('--socket')
     parser.add_argument('--duration', type=float, default=.05)
     parser.add_argument('--count', type=int, default=1)
     parser.add_argument('key')
     args = parser.parse_args()
 
-    with serial.Serial(args.serial, 9600) as ser:
+    if args.daemon:
+        # skips importing pyserial and opening the port
+        from switchctl import daemon
+
+        socket = args.socket or daemon.SOCKET_DEFAULT
+        with daemon.Client(socket) as client:
+            for _ in range(args.count):
+                client.press(args.key, args.duration, release=.05)
+        return 0
+
+    import serial
+
+    # a long --duration would otherwise be cut short by a watchdog armed in
+    # an earlier run
+    with serial.Serial(args.serial, 9600) as ser, \
+            controller.watchdog(ser, None):
         for _ in range(args.count):
-            ser.write(args.key.encode())
-            time.sleep(args.duration)
-            ser.write(b'0')
-            time.sleep(.05)
+            inputs.press(
+                ser,
+                args.key,
+                duration=args.duration,
+                release=.05,
+                quiet=True,
+            )
     return 0
 
 
@@ -1,24 +1,21 @@
 from __future__ import annotations
 
 import argparse
-import contextlib
 import sys
 import time
-from typing import Generator
+from typing import Sequence
 
 import cv2
 import numpy
 import serial
 
-SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
-
+from switchctl import alarm
+from switchctl import capture
+from switchctl import controller
+from switchctl import display
+from switchctl import inputs
 
-def _press(ser: serial.Serial, s: str, duration: float = .1) -> None:
-    print(f'{s=} {duration=}')
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
+SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
 
 def _dim(frame: numpy.ndarray) -> tuple[int, int, int, int]:
@@ -31,7 +28,7 @@ def _dim(frame: numpy.ndarray) -> tuple[int, int, int, int]:
     return (px, py, w, h)
 
 
-def _getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
+def _getframe(vid: capture.Capture) -> numpy.ndarray:
     _, frame = vid.read()
 
     px, py, w, h = _dim(frame)
@@ -44,53 +41,42 @@ def _getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
         1,
     )
 
-    cv2.imshow('game', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        raise SystemExit(0)
+    display.show(frame)
     return frame
 
 
-def _wait_and_render(vid: cv2.VideoCapture, t: float) -> None:
+def _wait_and_render(vid: capture.Capture, t: float) -> None:
     end = time.time() + t
     while time.time() < end:
         _getframe(vid)
 
 
-def _alarm(ser: serial.Serial, vid: cv2.VideoCapture) -> None:
+def _alarm(ser: controller.Controller, vid: capture.Capture) -> None:
+    alarm.start(ser)
     while True:
-        ser.write(b'!')
-        _wait_and_render(vid, .5)
-        ser.write(b'.')
-        _wait_and_render(vid, .5)
-
-
-@contextlib.contextmanager
-def _shh(ser: serial.Serial) -> Generator[None, None, None]:
-    try:
-        yield
-    finally:
-        ser.write(b'.')
+        _getframe(vid)
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
     parser.add_argument('--sleep-after', action='store_true')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    vid = cv2.VideoCapture(0)
-    vid.set(cv2.CAP_PROP_FRAME_WIDTH, 768)
-    vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    vid = capture.open(args.video, 768, 480)
 
     start = time.monotonic()
-    with serial.Serial(args.serial, 9600) as ser, _shh(ser):
+    with serial.Serial(args.serial, 9600) as port, inputs.shh(port), \
+            controller.watchdog(port, args.watchdog) as ser:
         ser.write(b'.')
         t0 = None
 
         while True:
             if t0 is None or (time.monotonic() - t0) >= 3 * 60 + 5:
                 print('-> button to prevent sleep')
-                _press(ser, 'X')
+                inputs.press(ser, 'X')
                 t0 = time.monotonic()
 
             _wait_and_render(vid, .25)
@@ -104,14 +90,14 @@ def main() -> int:
                 print(f'space time?! {whites=}')
                 print(f'{(time.monotonic() - start) / 60:.2f} minutes')
                 print('sleeping to wait...')
-                _press(ser, 'X')
+                inputs.press(ser, 'X')
                 _wait_and_render(vid, 200)
                 if args.sleep_after:
-                    _press(ser, 'H', duration=2)
-                    _press(ser, 'A')
+                    inputs.press(ser, 'H', duration=2)
+                    inputs.press(ser, 'A')
                     break
                 else:
-                    _press(ser, 'H')
+                    inputs.press(ser, 'H')
                     _alarm(ser, vid)
 
     vid.release()
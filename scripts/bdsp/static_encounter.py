@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import NamedTuple
+from typing import Sequence
+from typing import Tuple
+
+import cv2
+import serial
+from dotenv import load_dotenv
+
+from switchctl import capture
+from switchctl import controller
+from switchctl import frames
+from switchctl import inputs
+from switchctl import notify
+from switchctl import plan
+from switchctl import shiny
+from switchctl import timing
+from switchctl.detect import Probe
+
+# using the script, from the switch-microcontroller root
+# python -m scripts.bdsp.static_encounter arceus
+# (or the per target wrappers, python -m scripts.bdsp.arceus_reset)
+
+# Use load_env to trace the path of .env
+load_dotenv(os.path.join(os.path.dirname(__file__), '../../.env'))
+
+# find serial bus controller in Device Manager for COM Ports on your devices
+SERIAL_DEFAULT = 'COM3' if sys.platform == 'win32' else '/dev/ttyUSB0'
+
+Probes = Tuple[Probe, ...]
+Steps = Tuple[plan.Step, ...]
+
+
+def press(key: str, duration: float = .1) -> plan.Step:
+    # same timing as `inputs.press`
+    return plan.Step(key, duration, .075)
+
+
+def near(x: int, y: int, pixel: tuple[int, int, int]) -> Probe:
+    # same tolerance as `frames.color_near`
+    return Probe(x, y, pixel, 76)
+
+
+# the white battle dialog, its gaps are what the shiny check times
+DIALOG = Probe(900, 900, (254, 254, 254))
+
+RESTART = (
+    press('H'), plan.wait(1),
+    press('X'), plan.wait(1),
+    press('A'), plan.wait(3.5),
+    press('A'), plan.wait(1),
+    press('A'),
+)
+
+
+class Target(NamedTuple):
+    name: str  # for the notification
+    key: str  # for `shiny.capture_key`, keeps the collected stats
+    resets: int  # running number for the count of resets
+    # on screen once the game has loaded, A is mashed until then
+    loaded: Probes
+    # walking up to the pokemon
+    approach: Steps
+    # waited on after `approach` (mashing `mash` meanwhile), then `engage`
+    # starts the battle
+    until: Probes = ()
+    mash: str | None = None
+    engage: Steps = ()
+    threshold: float = 1
+    # a second dialog timed after the first: the pixel it ends on and the
+    # threshold of its delay
+    second: tuple[Probe, float] | None = None
+
+
+def play(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        steps: Steps,
+) -> None:
+    # like `plan.run` but keeps rendering through the waits
+    for step in steps:
+        if step.key:
+            inputs.press(ser, step.key, step.duration, release=step.release)
+        else:
+            frames.wait_and_render(vid, step.release)
+
+
+# waits through the first battle dialog, returns when it ended and when the
+# next one started (later for a shiny, the sparkle plays in between)
+def dialog_gap(
+        ser: controller.Controller,
+        vid: capture.Capture,
+) -> tuple[float, float]:
+    frames.await_probes(ser, vid, (DIALOG,))
+    print('dialog started')
+    frames.await_probes(ser, vid, (DIALOG,), present=False)
+
+    print('dialog ended')
+    t0 = time.monotonic()
+
+    frames.await_probes(ser, vid, (DIALOG,))
+
+    t1 = time.monotonic()
+    print(f'dialog delay: {t1 - t0:.3f}s')
+    return t0, t1
+
+
+def _send_email(notifier: notify.Notifier, name: str, count: int) -> None:
+    notifier.send(
+        'Check out the shiny encounter!',
+        f'Currently shiny hunting {name}! '
+        f'Finally encountered a shiny at {count} resets!',
+    )
+
+
+def run(target: Target, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--sigma', type=float, default=5)
+    parser.add_argument('--calibrate-after', type=int, default=50)
+    parser.add_argument('--stats', default=shiny.STATS_DEFAULT)
+    parser.add_argument('--resets', type=int, default=target.resets)
+    args = parser.parse_args(argv)
+
+    vid = capture.open(args.video, 768, 480)
+    classifier = shiny.DelayClassifier(
+        shiny.capture_key(target.key, args.video, 768, 480),
+        threshold=target.threshold,
+        sigma=args.sigma,
+        calibrate_after=args.calibrate_after,
+        stats_file=args.stats,
+    )
+    if target.second is not None:
+        _, threshold = target.second
+        classifier2 = shiny.DelayClassifier(
+            shiny.capture_key(f'{target.key}-2', args.video, 768, 480),
+            threshold=threshold,
+            sigma=args.sigma,
+            calibrate_after=args.calibrate_after,
+            stats_file=args.stats,
+        )
+    i = args.resets
+
+    notifier = notify.from_env()
+    with serial.Serial(args.serial, 9600) as port, inputs.shh(port), \
+            notifier, controller.watchdog(port, args.watchdog) as ser:
+        while True:
+            i = i + 1
+            print(' total count ', i)
+            phases = {}
+            t = time.monotonic()
+
+            def _phase(name: str) -> None:
+                nonlocal t
+                now = time.monotonic()
+                phases[name] = now - t
+                t = now
+
+            play(ser, vid, RESTART)
+            print('Loading screen!')
+            frames.await_probes(ser, vid, target.loaded, mash='A')
+            _phase('restart')
+
+            print('game loaded!')
+            play(ser, vid, target.approach)
+            if target.until:
+                frames.await_probes(ser, vid, target.until, mash=target.mash)
+            print('started battle!')
+            play(ser, vid, target.engage)
+            _phase('approach')
+
+            t0, t1 = dialog_gap(ser, vid)
+            _phase('dialog')
+
+            if classifier.is_shiny(t1 - t0):
+                print('SHINY!!!')
+                _send_email(notifier, target.name, i)
+                frames.alarm(ser, vid)
+
+            if target.second is not None:
+                probe, _ = target.second
+                frames.await_probes(ser, vid, (probe,))
+                t2 = time.monotonic()
+                print('2nd dialog ended')
+                print(f'2nd dialog delay: {t2 - t1:.3f}s')
+                _phase('2nd dialog')
+
+                if classifier2.is_shiny(t2 - t1):
+                    print('SHINY!!!')
+                    _send_email(notifier, target.name, i)
+                    frames.alarm(ser, vid)
+
+            for name, elapsed in phases.items():
+                timing.record(f'{target.key} {name}', elapsed)
+            print(
+                f'reset: {sum(phases.values()):.2f}s ' +
+                ' '.join(f'{k}={v:.2f}' for k, v in phases.items()),
+            )
+
+    vid.release()
+    cv2.destroyAllWindows()
+    return 0
+
+
+ARCEUS = Target(
+    name='Arceus',
+    key='arceus_reset',
+    resets=17114,
+    loaded=(near(500, 167, (255, 162, 107)),),
+    approach=(press('w', .5),),
+    until=(
+        near(900, 900, (254, 254, 254)),
+        near(236, 44, (157, 29, 20)),
+    ),
+    engage=(press('A'), plan.wait(1)),
+)
+DIALGA = Target(
+    name='Dialga',
+    key='dialga_reset',
+    resets=3091,
+    loaded=(near(659, 57, (248, 248, 248)),),
+    approach=(press('w', .5),),
+    until=(near(900, 900, (254, 254, 254)),),
+    engage=(
+        plan.wait(1), press('A'),
+        press('A'), plan.wait(1),
+    ),
+)
+GIRATINA = Target(
+    name='Giratina',
+    key='giratina_reset',
+    resets=934,
+    # some pixel on the ground, may break with the time of day
+    loaded=(near(642, 239, (58, 78, 63)),),
+    approach=(press('w', .5), press('A'), plan.wait(.5), press('A')),
+    engage=(plan.wait(1),),
+)
+RAMANAS = Target(
+    name='Rayquaza',
+    key='ramanas_reset',
+    resets=7720,
+    loaded=(near(659, 57, (248, 248, 248)),),
+    approach=(press('w', .7), press('A'), plan.wait(.5), press('A')),
+    engage=(plan.wait(1),),
+)
+
+TARGETS = {
+    'arceus': ARCEUS,
+    'dialga': DIALGA,
+    'giratina': GIRATINA,
+    'ramanas': RAMANAS,
+}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('target', choices=TARGETS)
+    args, rest = parser.parse_known_args(argv)
+    return run(TARGETS[args.target], rest)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
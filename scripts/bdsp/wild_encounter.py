@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import time
+from typing import Callable
+from typing import Dict
+from typing import NamedTuple
+from typing import Sequence
+from typing import Tuple
+
+import cv2
+import serial
+
+from scripts.bdsp import static_encounter
+from scripts.bdsp.static_encounter import DIALOG
+from scripts.bdsp.static_encounter import press
+from switchctl import calibrate
+from switchctl import capture
+from switchctl import controller
+from switchctl import detect
+from switchctl import frames
+from switchctl import inputs
+from switchctl import notify
+from switchctl import plan
+from switchctl import reflex
+from switchctl import shiny
+from switchctl import timing
+from switchctl.detect import Probe
+
+# using the script, from the switch-microcontroller root
+# python -m scripts.bdsp.wild_encounter scent
+# (or the per trigger wrappers, python -m scripts.bdsp.scent_hunt)
+
+# probe table labels, see `python -m switchctl.calibrate`
+OVERWORLD = 'bdsp-overworld'
+BATTLE_MENU = 'bdsp-battle-menu'  # fight / bag / run / pokemon
+
+# the "!" over the player once something bites
+BITE = Probe(984, 415, (255, 255, 255))
+
+Table = Dict[str, Tuple[Probe, ...]]
+Trigger = Callable[[controller.Controller, capture.Capture, Table], None]
+
+
+class Hunt(NamedTuple):
+    name: str  # for the notification
+    key: str  # for `shiny.capture_key`, keeps the collected stats
+    encounters: int  # running number for the count of encounters
+    # returns once a battle is on its way
+    trigger: Trigger
+    threshold: float = 1
+
+
+def _walk(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        table: Table,
+) -> None:
+    # back and forth through the grass until the overworld goes away
+    end = time.monotonic() + 120
+    for key in itertools.cycle('ad'):
+        inputs.press(ser, key, .5, quiet=True)
+        if not all(detect.match(frames.getframe(vid), table[OVERWORLD])):
+            return
+        if time.monotonic() > end:
+            print('nothing showed up')
+            frames.alarm(ser, vid)
+
+
+# X, bag, the item registered first, use it
+SWEET_SCENT = (
+    press('X'), plan.wait(1),
+    press('A'), plan.wait(1),
+    press('A'), plan.wait(1),
+    press('j'), plan.wait(1),
+    press('A'),
+)
+
+
+def _scent(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        table: Table,
+) -> None:
+    static_encounter.play(ser, vid, SWEET_SCENT)
+
+
+def _fish(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        table: Table,
+) -> None:
+    end = time.monotonic() + 90
+    # the first A has to land within the bite window, it goes out from the
+    # capture thread through the hunt's controller
+    bite = reflex.Reflex(vid, ser, (BITE,), 'A')
+    while time.monotonic() < end:
+        # cast the rod registered to +, then a bite or "not even a nibble"
+        inputs.press(ser, '+')
+        print('fishing...')
+        bite.arm()
+        while time.monotonic() < end:
+            if bite.wait(.05):
+                assert bite.latency is not None
+                print(f'fishy, reacted in {bite.latency * 1000:.1f}ms')
+                inputs.press(ser, 'A')
+                frames.wait_and_render(vid, 1.5)
+                inputs.press(ser, 'A')
+                return
+            elif all(detect.match(frames.getframe(vid), (DIALOG,))):
+                bite.disarm()
+                inputs.press(ser, 'A')
+                frames.await_probes(ser, vid, (DIALOG,), present=False)
+                break
+        bite.disarm()
+
+    print('nothing bit')
+    frames.alarm(ser, vid)
+
+
+def _run_away(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        table: Table,
+        *,
+        timeout: float = 30,
+) -> None:
+    # the menu only shows once intimidate and friends are done, and again if
+    # running failed
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        frame = frames.getframe(vid)
+        if all(detect.match(frame, table[OVERWORLD])):
+            return
+        elif all(detect.match(frame, table[BATTLE_MENU])):
+            print('Run Away!')
+            inputs.press(ser, 'u')
+            frames.wait_and_render(vid, .5)
+            inputs.press(ser, 'A')
+
+    print('could not run away')
+    frames.alarm(ser, vid)
+
+
+def _send_email(notifier: notify.Notifier, name: str, count: int) -> None:
+    notifier.send(
+        'Check out the shiny encounter!',
+        f'Currently shiny hunting {name}! '
+        f'Finally encountered a shiny at {count} encounters!',
+    )
+
+
+def run(hunt: Hunt, argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serial', default=static_encounter.SERIAL_DEFAULT)
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--sigma', type=float, default=5)
+    parser.add_argument('--calibrate-after', type=int, default=50)
+    parser.add_argument('--stats', default=shiny.STATS_DEFAULT)
+    parser.add_argument('--probes', default=calibrate.TABLE_DEFAULT)
+    parser.add_argument('--encounters', type=int, default=hunt.encounters)
+    args = parser.parse_args(argv)
+
+    table = calibrate.load_table(args.probes)
+    vid = capture.open(args.video, 768, 480)
+    classifier = shiny.DelayClassifier(
+        shiny.capture_key(hunt.key, args.video, 768, 480),
+        threshold=hunt.threshold,
+        sigma=args.sigma,
+        calibrate_after=args.calibrate_after,
+        stats_file=args.stats,
+    )
+    i = args.encounters
+
+    notifier = notify.from_env()
+    with serial.Serial(args.serial, 9600) as port, inputs.shh(port), \
+            notifier, controller.watchdog(port, args.watchdog) as ser:
+        while True:
+            phases = {}
+            t = time.monotonic()
+
+            def _phase(name: str) -> None:
+                nonlocal t
+                now = time.monotonic()
+                phases[name] = now - t
+                t = now
+
+            hunt.trigger(ser, vid, table)
+            i = i + 1
+            print('count', i)
+            _phase('trigger')
+
+            t0, t1 = static_encounter.dialog_gap(ser, vid)
+            _phase('dialog')
+
+            if classifier.is_shiny(t1 - t0):
+                print('SHINY!!!')
+                _send_email(notifier, hunt.name, i)
+                frames.alarm(ser, vid)
+
+            _run_away(ser, vid, table)
+            _phase('flee')
+
+            for name, elapsed in phases.items():
+                timing.record(f'{hunt.key} {name}', elapsed)
+            print(
+                f'encounter: {sum(phases.values()):.2f}s ' +
+                ' '.join(f'{k}={v:.2f}' for k, v in phases.items()),
+            )
+
+    vid.release()
+    cv2.destroyAllWindows()
+    return 0
+
+
+GRASS = Hunt(
+    name='random grass encounters',
+    key='grass_hunt',
+    encounters=934,
+    trigger=_walk,
+)
+SCENT = Hunt(
+    name='sweet scent encounters',
+    key='scent_hunt',
+    encounters=0,
+    trigger=_scent,
+)
+FISHING = Hunt(
+    name='fishing encounters',
+    key='fishing_hunt',
+    encounters=5896,
+    trigger=_fish,
+)
+
+HUNTS = {
+    'grass': GRASS,
+    'scent': SCENT,
+    'fishing': FISHING,
+}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('hunt', choices=HUNTS)
+    args, rest = parser.parse_known_args(argv)
+    return run(HUNTS[args.hunt], rest)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
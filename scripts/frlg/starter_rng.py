@@ -1,99 +1,107 @@
+import argparse
+import json
+import os
 import time
+
 import serial
 
+from switchctl import controller
+from switchctl import gen3rng
+
 PORT = 'COM5'
 BAUD = 9600
 
-SWITCH_REPORT_INTERVAL = 0.1
-SWITCH_REPORT_THRESHOLD = 5.0
-RELEASE_BYTE = b'.'
+# the firmware keeps sending the last state it was given, the host only has
+# to say when it changes.  the controller's heartbeats keep the firmware's
+# watchdog fed, it releases everything if the host goes quiet for a second
+NEUTRAL_BYTE = b'0'
+WATCHDOG = 1.0
 RELEASE_DURATION = 0.2
 INTER_PRESS_GAP = 0.75
 
+CALIBRATION_DEFAULT = 'starter_rng.json'
+
 
 # --- Core helpers ---
+#
+# Every helper runs until an absolute deadline (time.perf_counter()) and
+# returns it, so the time spent printing and writing never adds up over the
+# ~70s between the title screen and the starter.
 
-def send(ser, byte):
+def send(ctl, byte):
+    """Write through the controller, so heartbeats never interleave."""
     data = byte.encode() if isinstance(byte, str) else byte
-    ser.write(data)
-    ser.flush()
+    ctl.write(data)
+    ctl.ser.flush()
+
+
+def sleep_until(until):
+    time.sleep(max(0, until - time.perf_counter()))
+    return until
 
 
-def neutral(ser, seconds):
-    """Send neutral reports for a given duration — keeps Switch connected."""
-    end_time = time.time() + seconds
-    while time.time() < end_time:
-        send(ser, RELEASE_BYTE)
-        remaining = end_time - time.time()
-        time.sleep(min(SWITCH_REPORT_INTERVAL, max(0, remaining)))
+def neutral(ctl, until):
+    """Release everything and stay released until `until`."""
+    send(ctl, NEUTRAL_BYTE)
+    return sleep_until(until)
 
 
-def tap(ser, button, gap=INTER_PRESS_GAP):
+def tap(ctl, button, start, gap=INTER_PRESS_GAP):
     """Send a single report with the button pressed, then release. True tap."""
     print(f"Tap {button!r}")
-    send(ser, button)
-    neutral(ser, RELEASE_DURATION + gap)
+    send(ctl, button)
+    return neutral(ctl, start + RELEASE_DURATION + gap)
 
 
-def press(ser, button, hold=0.4, gap=INTER_PRESS_GAP):
+def press(ctl, button, start, hold=0.4, gap=INTER_PRESS_GAP):
     """Press and hold a button for `hold` seconds, then release."""
     print(f"Press {button!r} (hold={hold}s, gap={gap}s)")
+    send(ctl, button)
+    end_time = sleep_until(start + hold)
+    return neutral(ctl, end_time + RELEASE_DURATION + gap)
 
-    # Hold
-    end_time = time.time() + hold
-    while time.time() < end_time:
-        send(ser, button)
-        remaining = end_time - time.time()
-        time.sleep(min(SWITCH_REPORT_INTERVAL, max(0, remaining)))
 
-    # Release + gap
-    neutral(ser, RELEASE_DURATION + gap)
+def wait(seconds, start):
+    print(f"Wait {seconds}s")
+    return sleep_until(start + seconds)
 
 
-def wait(seconds, ser=None):
-    if ser and seconds > SWITCH_REPORT_THRESHOLD:
-        print(f"Wait {seconds}s (keeping Switch connected)")
-        neutral(ser, seconds)
-    else:
-        print(f"Wait {seconds}s")
-        time.sleep(seconds)
-
-
-def wait_ms(ms, ser=None):
+def wait_ms(ms, start):
     print(f"Wait {ms}ms")
-    wait(ms / 1000, ser=ser)
+    return wait(ms / 1000, start)
 
 
 # --- Sequence Runner ---
 
-def run_sequence(ser, sequence):
+def run_sequence(ctl, sequence):
+    t0 = t = time.perf_counter()
     for step in sequence:
         action = step[0]
 
         if action == "tap":
             _, button = step
-            tap(ser, button)
+            t = tap(ctl, button, t)
 
         elif action == "press":
             if len(step) == 2:
                 _, button = step
-                press(ser, button)
+                t = press(ctl, button, t)
             elif len(step) == 3:
                 _, button, duration = step
-                press(ser, button, hold=float(duration))
+                t = press(ctl, button, t, hold=float(duration))
             elif len(step) == 4:
                 _, button, hold, gap = step
-                press(ser, button, hold=float(hold), gap=float(gap))
+                t = press(ctl, button, t, hold=float(hold), gap=float(gap))
             else:
                 raise ValueError(f"Invalid press step: {step}")
 
         elif action == "wait":
             _, seconds = step
-            wait(float(seconds), ser=ser)
+            t = wait(float(seconds), t)
 
         elif action == "wait_ms":
             _, ms = step
-            wait_ms(float(ms), ser=ser)
+            t = wait_ms(float(ms), t)
 
         elif action == "repeat":
             _, count, button, *rest = step
@@ -110,49 +118,162 @@ def run_sequence(ser, sequence):
             print(f"Repeat {button!r} x{count} (hold={hold_time:.3f}s, "
                   f"budget={total_time}s, reserved={final_budget}s)")
             for _ in range(count):
-                press(ser, button, hold=hold_time)
+                t = press(ctl, button, t, hold=hold_time)
 
         else:
             raise ValueError(f"Unknown action: {action}")
 
+    late = time.perf_counter() - t
+    print(f"Sequence took {t - t0:.3f}s, finished {late * 1000:.1f}ms late")
+
 
 # --- Sequence ---
 
 FINAL_PRESS_BUDGET = 0.8
 
-sequence = [
+# The two delays the RNG depends on: from the start of the sequence to the
+# title screen press (which picks the seed), and from that press to the
+# starter being picked (the frame).
+SEED_MS = 30842
+FRAME_S = 23.807
+
+
+def build_sequence(seed_ms=SEED_MS, frame_s=FRAME_S):
+    return [
 
-    # ("tap", "A"),
-    # ("wait", 1),
-    # ("tap", "A"),
-    # ("wait", 1.25),
-    # ("tap", "H"),
+        # ("tap", "A"),
+        # ("wait", 1),
+        # ("tap", "A"),
+        # ("wait", 1.25),
+        # ("tap", "H"),
 
-    # ("wait", 2),
-    ("tap", "A"),
+        # ("wait", 2),
+        ("tap", "A"),
 
-    ("wait_ms", 30842),
+        ("wait_ms", seed_ms),
 
-    ("press", "A", 3),
+        ("press", "A", 3),
 
-    ("wait", 23.807),
-    ("press", "A"),
+        ("wait", frame_s),
+        ("press", "A"),
 
-    ("repeat", 8, "A", 10.406, FINAL_PRESS_BUDGET),
-    ("press", "A"),
-]
+        ("repeat", 8, "A", 10.406, FINAL_PRESS_BUDGET),
+        ("press", "A"),
+    ]
+
+
+# --- Calibration ---
+
+def load_calibration(path):
+    if not os.path.exists(path):
+        return {"seed_ms": SEED_MS, "frame_s": FRAME_S}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_calibration(path, calibration):
+    with open(path, "w") as f:
+        json.dump(calibration, f, indent=2)
+        f.write("\n")
+
+
+def ask_result():
+    """The observed nature and (optionally) IVs, None to stop."""
+    while True:
+        answer = input(
+            "Observed nature and IVs (e.g. 'adamant 31/20/15/31/8/3'), "
+            "blank to stop: "
+        ).strip().lower()
+        if not answer:
+            return None
+        nature, _, ivs = answer.partition(" ")
+        if nature not in gen3rng.NATURES:
+            print(f"Unknown nature {nature!r}")
+            continue
+        try:
+            return nature, gen3rng.parse_ivs(ivs) if ivs else None
+        except ValueError as e:
+            print(e)
+
+
+def adjust(calibration, hit, target_ms, target_frame):
+    """Move both delays by how far off the observed hit was."""
+    seed_off = hit.seed_ms - target_ms
+    frame_off = hit.frame - target_frame
+    print(f"Hit {hit}")
+    print(f"Seed off by {seed_off:+d}ms, frame off by {frame_off:+d}")
+    calibration["seed_ms"] -= seed_off
+    calibration["frame_s"] = round(
+        calibration["frame_s"] - frame_off / gen3rng.FPS, 4,
+    )
+    return seed_off == 0 and frame_off == 0
 
 
 # --- Main ---
 
-def main():
-    with serial.Serial(PORT, BAUD, timeout=1) as ser:
-        print("Starting sequence...")
-        print("Waiting for Switch to register controller...")
-        neutral(ser, 5.0)
-        run_sequence(ser, sequence)
-        print("Sequence completed!")
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", default=PORT)
+    parser.add_argument("--calibration", default=CALIBRATION_DEFAULT)
+    # RNG mode: the target seed first, then the seeds around it, as MS:SEED
+    parser.add_argument("--seed", action="append", type=gen3rng.parse_seed)
+    parser.add_argument("--frame", type=int)
+    # frames either side of the target to look a result up in
+    parser.add_argument("--window", type=int, default=2000)
+    # or a table from `python -m switchctl.gen3rng build`
+    parser.add_argument("--table")
+    args = parser.parse_args(argv)
+
+    if (args.seed is None) != (args.frame is None):
+        parser.error("--seed and --frame go together")
+
+    calibration = load_calibration(args.calibration)
+    table = None
+    if args.seed:
+        target_ms, _ = args.seed[0]
+        if args.table:
+            table = gen3rng.FrameTable.load(args.table)
+        else:
+            start = max(0, args.frame - args.window)
+            table = gen3rng.FrameTable.build(
+                args.seed, start, args.frame + args.window - start,
+            )
+
+    with serial.Serial(args.port, BAUD, timeout=1) as ser, \
+            controller.Controller(ser, watchdog=WATCHDOG) as ctl:
+        try:
+            while True:
+                print("Starting sequence...")
+                print("Waiting for Switch to register controller...")
+                neutral(ctl, time.perf_counter() + 5.0)
+                print(f"Delays: seed {calibration['seed_ms']}ms, "
+                      f"frame {calibration['frame_s']}s")
+                run_sequence(ctl, build_sequence(**calibration))
+                print("Sequence completed!")
+
+                if table is None:
+                    break
+
+                result = ask_result()
+                if result is None:
+                    break
+                hits = table.lookup(*result)
+                if not hits:
+                    print("No frame near the target gives that, "
+                          "try a bigger --window, more --seed or a --table")
+                else:
+                    hit = min(hits, key=lambda h: (
+                        abs(h.seed_ms - target_ms), abs(h.frame - args.frame),
+                    ))
+                    done = adjust(calibration, hit, target_ms, args.frame)
+                    save_calibration(args.calibration, calibration)
+                    if done:
+                        print("Hit the target!")
+                        break
+                input("Reset the game and press enter for the next attempt...")
+        finally:
+            send(ctl, NEUTRAL_BYTE)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,121 +3,314 @@ from __future__ import annotations
 import argparse
 import sys
 import time
+from typing import AbstractSet
+from typing import Sequence
+from typing import Tuple
+from typing import TYPE_CHECKING
 
 import serial
 
+from switchctl import calibrate
+from switchctl import capture
+from switchctl import controller
+from switchctl import detect
+from switchctl import frames
+from switchctl import plan
+from switchctl.detect import Probe
+
+if TYPE_CHECKING:
+    import numpy
+
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
+COLS, ROWS = 6, 5
+# distance between box slots of a 1280x720 capture
+SLOT_PITCH = (86, 86)
+
+# probe table labels, see `python -m switchctl.calibrate`.  the slot labels
+# are calibrated on the top left slot and shifted to the others
+BOXES = 'home-boxes'
+RELEASE_DIALOG = 'home-release-dialog'
+EMPTY_SLOT = 'home-empty-slot'
+MARKED_SLOT = 'home-marked-slot'
+CURSOR = 'home-cursor'  # the hand over a slot, in multi select
+
+# mean grey difference of `_box_thumb` between frames: the box scrolled, and
+# came to rest
+BOX_MOVED = 8
+BOX_SETTLED = 1
+
+Slot = Tuple[int, int]  # (row, col)
+ALL_SLOTS = frozenset(
+    (row, col) for row in range(ROWS) for col in range(COLS)
+)
+
+
+def _shift(probes: Sequence[Probe], slot: Slot) -> tuple[Probe, ...]:
+    row, col = slot
+    dx, dy = col * SLOT_PITCH[0], row * SLOT_PITCH[1]
+    return tuple(p._replace(x=p.x + dx, y=p.y + dy) for p in probes)
+
+
+def _slots(frame: numpy.ndarray, probes: Sequence[Probe]) -> set[Slot]:
+    return {
+        slot for slot in ALL_SLOTS
+        if all(detect.match(frame, _shift(probes, slot)))
+    }
+
+
+def _box_thumb(frame: numpy.ndarray, probes: Sequence[Probe]) -> numpy.ndarray:
+    # the box name and the slots, placed by the calibrated top left slot.
+    # the name differs from box to box even when the slots look the same
+    x, y = probes[0].x, probes[0].y
+    half_x, half_y = SLOT_PITCH[0] // 2, SLOT_PITCH[1] // 2
+    x0, x1 = max(x - half_x, 0), x + (COLS - 1) * SLOT_PITCH[0] + half_x
+    y0 = max(y - half_y - SLOT_PITCH[1], 0)
+    y1 = y + (ROWS - 1) * SLOT_PITCH[1] + half_y
+    return frame[y0:y1:4, x0:x1:4].mean(axis=2)
+
+
+def _cursor(frame: numpy.ndarray, probes: Sequence[Probe]) -> Slot | None:
+    slots = _slots(frame, probes)
+    return next(iter(slots)) if len(slots) == 1 else None
+
+
+def _order(slots: AbstractSet[Slot]) -> list[Slot]:
+    # snake through the rows so the cursor never doubles back on a row
+    order = []
+    for row in range(ROWS):
+        cols = range(COLS) if row % 2 == 0 else reversed(range(COLS))
+        order.extend((row, col) for col in cols if (row, col) in slots)
+    return order
+
+
+def _path(
+        start: Slot,
+        slots: AbstractSet[Slot],
+) -> tuple[list[plan.Step], Slot]:
+    steps = []
+    pos = start
+    for slot in _order(slots):
+        steps.extend(_moves(pos, slot))
+        steps.append(plan.Step('A'))
+        pos = slot
+    return steps, pos
+
+
+def _moves(src: Slot, dst: Slot) -> list[plan.Step]:
+    (r0, c0), (r1, c1) = src, dst
+    return (
+        [plan.Step('s' if r1 > r0 else 'w')] * abs(r1 - r0) +
+        [plan.Step('d' if c1 > c0 else 'a')] * abs(c1 - c0)
+    )
+
+
+# the blind parts of a release, shared by the real run and --dry-run
+LAUNCH = (plan.Step('A', .05, 1.75), plan.Step('A', .05, 1), plan.Step('A'))
+TO_GAME_BOXES = (plan.Step('d', .05, .1),) * 6
+NEXT_BOX = (plan.Step('R', .05, .5),)
+ENTER_MULTI_SELECT = (
+    plan.Step('A', .05, 1),
+    plan.Step('w'),
+    plan.Step('w'),
+    plan.Step('A', .05, 1.25),
+    plan.Step('s'),
+)
+RELEASE = (plan.Step('+'),)
+CONFIRM = (plan.Step('w'), plan.Step('A', .05, 2), plan.Step('A'))
+SAVE = (
+    plan.Step('+', .05, 2),
+    plan.Step('A', .05, 15),
+    plan.Step('A', .05, 3),
+)
+# what the waits on the screen usually take, for --dry-run
+EXPECTED = {
+    'launch': 8,
+    BOXES: .75,
+    RELEASE_DIALOG: 1.5,
+    'released': 2.5,
+}
+
 
-def _press(ser: serial.Serial, s: str, *, duration: float = .05) -> None:
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.15)
-
-
-def _release(ser: serial.Serial, box_offset: int, box_n: int) -> None:
-    _press(ser, 'A')
-    time.sleep(1.75)
-    _press(ser, 'A')
-    time.sleep(1)
-    _press(ser, 'A')
-    time.sleep(8)
-
-    # move to game boxes
-    for _ in range(6):
-        _press(ser, 'd')
-        time.sleep(.1)
-
-    # move offset to correct position
-    for _ in range(box_offset):
-        _press(ser, 'R')
-        time.sleep(1.25)
-
-    for _ in range(box_n):
-        # box 1
-        _press(ser, 'A')
-        time.sleep(1)
-        _press(ser, 'w')
-        _press(ser, 'w')
-        _press(ser, 'A')
-        time.sleep(1.25)
-        _press(ser, 's')
-        _press(ser, 'A')
-        time.sleep(.5)
-
-        # mark first 4 rows
-        for _ in range(2):
-            for _ in range(5):
-                _press(ser, 'd')
-                _press(ser, 'A')
-            _press(ser, 's')
-            _press(ser, 'A')
-            for _ in range(5):
-                _press(ser, 'a')
-                _press(ser, 'A')
-            _press(ser, 's')
-            _press(ser, 'A')
-
-        # mark last row
-        for _ in range(5):
-            _press(ser, 'd')
-            _press(ser, 'A')
-
-        # return to 0, 0
-        for _ in range(4):
-            _press(ser, 'w')
-        for _ in range(5):
-            _press(ser, 'a')
-
-        # perform the release
-        _press(ser, '+')
-        time.sleep(1.5)
-        _press(ser, 'w')
-        _press(ser, 'A')
-        time.sleep(2)
-        _press(ser, 'A')
-        time.sleep(2.5)
-
-        # on to the next box!
-        _press(ser, 'R')
-        time.sleep(1.25)
-
-    # save back to title
-    _press(ser, '+')
-    time.sleep(2)
-    _press(ser, 'A')
-    time.sleep(15)
-    _press(ser, 'A')
-    time.sleep(3)
-
-
-def main() -> int:
+def box_plan(occupied: frozenset[Slot] = ALL_SLOTS) -> list[plan.Step]:
+    steps, pos = _path((0, 0), occupied)
+    return [
+        *ENTER_MULTI_SELECT,
+        *steps,
+        *_moves(pos, (0, 0)),
+        *RELEASE,
+        plan.wait(EXPECTED[RELEASE_DIALOG]),
+        *CONFIRM,
+        plan.wait(EXPECTED['released']),
+    ]
+
+
+def job_plan(
+        offset: int,
+        box_count: int,
+        per_session: int,
+) -> list[tuple[str, list[plan.Step]]]:
+    sections = []
+    next_box = [*NEXT_BOX, plan.wait(EXPECTED[BOXES])]
+    while offset < box_count:
+        box_n = min(box_count - offset, per_session)
+        launch = [*LAUNCH, plan.wait(EXPECTED['launch']), *TO_GAME_BOXES]
+        sections.append(('launch', launch + next_box * offset))
+        for i in range(offset, offset + box_n):
+            box = box_plan()
+            if i != offset + box_n - 1:
+                box.extend(next_box)
+            sections.append((f'box {i + 1}', box))
+        sections.append(('save', list(SAVE)))
+        offset += box_n
+    return sections
+
+
+class Releaser:
+    def __init__(
+            self,
+            ser: controller.Controller,
+            vid: capture.Capture,
+            table: dict[str, tuple[Probe, ...]],
+    ) -> None:
+        self.ser = ser
+        self.vid = vid
+        self.table = table
+
+    def _await(self, label: str, *, timeout: float = 15) -> None:
+        probes = self.table[label]
+        frames.await_probes(self.ser, self.vid, probes, timeout=timeout)
+
+    # the cursor is read back before every press that acts on a slot, a
+    # dropped direction would otherwise shift every later mark
+    def _goto(self, slot: Slot) -> None:
+        for _ in range(3):
+            pos = _cursor(frames.getframe(self.vid), self.table[CURSOR])
+            if pos == slot:
+                return
+            elif pos is not None:
+                plan.run(self.ser, _moves(pos, slot))
+            frames.wait_and_render(self.vid, .25)
+        print(f'could not move the cursor to {slot}')
+        frames.alarm(self.ser, self.vid)
+
+    def launch(self, box_offset: int) -> None:
+        plan.run(self.ser, LAUNCH)
+        self._await(BOXES, timeout=30)
+        plan.run(self.ser, TO_GAME_BOXES)
+        for _ in range(box_offset):
+            self.next_box()
+
+    # the box view matches all through the scroll, so the box is only read
+    # once its contents moved and came to rest again
+    def next_box(self, *, timeout: float = 5) -> None:
+        probes = self.table[EMPTY_SLOT]
+        prev = _box_thumb(frames.getframe(self.vid), probes)
+        plan.run(self.ser, NEXT_BOX)
+
+        end = time.monotonic() + timeout
+        moved = False
+        while time.monotonic() < end:
+            thumb = _box_thumb(frames.getframe(self.vid), probes)
+            diff = abs(thumb - prev).mean()
+            if not moved:
+                moved = diff > BOX_MOVED
+            elif diff < BOX_SETTLED:
+                self._await(BOXES)
+                return
+            if moved:
+                prev = thumb
+        print('the next box did not show up')
+        frames.alarm(self.ser, self.vid)
+
+    # a slot only gets pressed again once its mark had time to show, a
+    # second A on a slow mark would unmark it
+    def _mark(self, slot: Slot) -> None:
+        probes = _shift(self.table[MARKED_SLOT], slot)
+        for _ in range(3):
+            if all(detect.match(frames.getframe(self.vid), probes)):
+                return
+            self._goto(slot)
+            plan.run(self.ser, (plan.Step('A'),))
+            if detect.await_probes(self.vid, probes, timeout=2):
+                return
+        print(f'could not mark {slot}')
+        frames.alarm(self.ser, self.vid)
+
+    def release_box(self) -> int:
+        frame = frames.getframe(self.vid)
+        occupied = ALL_SLOTS - _slots(frame, self.table[EMPTY_SLOT])
+        if not occupied:
+            return 0
+
+        plan.run(self.ser, ENTER_MULTI_SELECT)
+
+        for slot in _order(occupied):
+            self._mark(slot)
+        marked = _slots(frames.getframe(self.vid), self.table[MARKED_SLOT])
+        if marked != occupied:
+            print('marks do not match the occupied slots')
+            frames.alarm(self.ser, self.vid)
+
+        self._goto((0, 0))
+        plan.run(self.ser, RELEASE)
+        self._await(RELEASE_DIALOG)
+        plan.run(self.ser, CONFIRM)
+        self._await(BOXES)
+        return len(occupied)
+
+    def save(self) -> None:
+        # save back to title
+        plan.run(self.ser, SAVE)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('box_count', type=int)
     parser.add_argument('--offset', type=int, default=0)
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--probes', default=calibrate.TABLE_DEFAULT)
+    # boxes to release before saving and relaunching, default all of them
+    parser.add_argument('--per-session', type=int)
+    # print the input plan (every box full) and its timing instead of running
     parser.add_argument('--dry-run', action='store_true')
-    args = parser.parse_args()
+    parser.add_argument('--emit-plan')
+    args = parser.parse_args(argv)
 
     todo = args.box_count - args.offset
     offset = args.offset
+    per_session = args.per_session or todo
+
+    if args.dry_run or args.emit_plan:
+        sections = job_plan(offset, args.box_count, per_session)
+        print(plan.report(sections))
+        if args.emit_plan:
+            plan.emit(args.emit_plan, sections)
+        return 0
+
+    table = calibrate.load_table(args.probes)
+    vid = capture.open(args.video, 1280, 720)
 
-    with serial.Serial(args.serial, 9600) as ser:
+    with serial.Serial(args.serial, 9600) as port, \
+            controller.watchdog(port, args.watchdog) as ser:
+        releaser = Releaser(ser, vid, table)
         while todo:
-            if todo >= 3:
-                box_n = 3
-            else:
-                box_n = todo
-
-            if args.dry_run:
-                for i in range(offset, offset + box_n):
-                    print(f'would release box {i + 1}')
-            else:
-                _release(ser, offset, box_n)
+            box_n = min(todo, per_session)
+
+            releaser.launch(offset)
+            for i in range(offset, offset + box_n):
+                released = releaser.release_box()
+                print(f'box {i + 1}: released {released}')
+                if i != offset + box_n - 1:
+                    releaser.next_box()
+            releaser.save()
+
             todo -= box_n
             offset += box_n
 
+    vid.release()
     return 0
 
 
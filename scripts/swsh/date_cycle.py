@@ -1,102 +1,63 @@
 from __future__ import annotations
 
 import argparse
-import calendar
-import datetime
+import functools
 import sys
-import time
+from typing import Sequence
 
 import serial
 
-SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
-
-
-def _press(ser: serial.Serial, s: str, duration: float = .05) -> None:
-    print(f'{s=} {duration=}')
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
-
-
-def _open_date_panel(ser: serial.Serial) -> None:
-    _press(ser, 'H')
-    time.sleep(.8)
-
-    _press(ser, 's')
-    _press(ser, 'd', duration=.55)
-    _press(ser, 'A')
-    time.sleep(1)
-
-    _press(ser, 's', duration=1.2)
-    _press(ser, 'A')
-    time.sleep(.75)
-
-    _press(ser, 's', duration=.5)
-    _press(ser, 'A')
-    time.sleep(.75)
-
-    for i in range(2):
-        _press(ser, 's')
-    _press(ser, 'A')
-    time.sleep(.75)
+from switchctl import calibrate
+from switchctl import capture
+from switchctl import controller
+from switchctl import datepanel
+from switchctl import frames
+from switchctl import inputs
 
+SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
-def _return_to_game_from_date_panel(ser: serial.Serial) -> None:
-    _press(ser, 'H')
-    time.sleep(1)
-    _press(ser, 'H')
-    time.sleep(2)
+_press = functools.partial(inputs.press, duration=.05)
 
 
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
-    parser.add_argument('--date', type=datetime.date.fromisoformat)
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
-    args = parser.parse_args()
-
-    current_date = args.date
-
-    with serial.Serial(args.serial, 9600) as ser:
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--digits', default=datepanel.DIGITS_DEFAULT)
+    parser.add_argument('--probes', default=calibrate.TABLE_DEFAULT)
+    # days to skip per trip into the settings
+    parser.add_argument('--days', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    digits = datepanel.Digits.load(args.digits)
+    table = calibrate.load_table(args.probes)
+    vid = capture.open(args.video, 1280, 720)
+
+    with serial.Serial(args.serial, 9600) as port, \
+            controller.watchdog(port, args.watchdog) as ser:
+        panel = datepanel.DatePanel(ser, vid, digits, table)
         while True:
             _press(ser, 'A')
-            time.sleep(4)
+            frames.wait_and_render(vid, 4)
 
-            _open_date_panel(ser)
+            panel.open()
 
-            target_date = current_date + datetime.timedelta(days=1)
-            if current_date.month != target_date.month:
-                _press(ser, 'w')
-            _press(ser, 'd')
-            _press(ser, 'w')
-            if current_date.month != target_date.month:
-                _, target_max_days = calendar.monthrange(
-                    target_date.year,
-                    target_date.month,
-                )
-                for _ in range(target_max_days - current_date.day):
-                    _press(ser, 'w')
-            _press(ser, 'd')
-            if current_date.year != target_date.year:
-                _press(ser, 'w')
-            _press(ser, 'd', duration=.5)
-            _press(ser, 'A')
-            time.sleep(.5)
-            current_date = target_date
+            current_date = panel.skip(args.days)
             print(f'date is now {current_date}')
 
-            _return_to_game_from_date_panel(ser)
+            datepanel.return_to_game(ser)
 
             _press(ser, 'B')
-            time.sleep(1)
+            frames.wait_and_render(vid, 1)
             _press(ser, 'A')
-            time.sleep(5)
+            frames.wait_and_render(vid, 5)
             _press(ser, 'A')
-            time.sleep(.5)
+            frames.wait_and_render(vid, .5)
             _press(ser, 'A')
-            time.sleep(.5)
+            frames.wait_and_render(vid, .5)
             _press(ser, 'A')
-            time.sleep(2)
+            frames.wait_and_render(vid, 2)
 
 
 if __name__ == '__main__':
@@ -1,32 +1,33 @@
 from __future__ import annotations
 
-import cv2
-import numpy
+import argparse
+from typing import Sequence
 
+from switchctl import capture
+from switchctl import frames
+from switchctl import raidcard
 
-def _getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
-    _, frame = vid.read()
-    cv2.imshow('game', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        raise SystemExit(0)
-    return frame
 
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--templates', default=raidcard.TEMPLATES_DEFAULT)
+    args = parser.parse_args(argv)
 
-def main() -> int:
-    vid = cv2.VideoCapture(0)
-    vid.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+    templates = raidcard.Templates.load(args.templates)
+    vid = capture.open(args.video, 1280, 720)
 
+    last = None
     while True:
-        frame = _getframe(vid)
-
-        if numpy.array_equal(frame[457][881], (16, 16, 16)):
-            print('menu is open')
-
-            if all(c >= 210 for c in frame[61][315]):
-                print('5 star!')
-
-            print(f'{frame[115, 70]=} {frame[115, 216]=}')
+        frame = frames.getframe(vid)
+
+        if raidcard.menu_open(frame):
+            card = templates.read(frame)
+            if card != last:
+                print(card)
+                last = card
+        else:
+            last = None
 
     return 0
 
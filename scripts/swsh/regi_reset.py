@@ -1,150 +1,111 @@
 from __future__ import annotations
 
 import argparse
-import contextlib
 import sys
 import time
-from typing import Generator
+from typing import Sequence
 
 import cv2
-import numpy
 import serial
 
+from switchctl import capture
+from switchctl import controller
+from switchctl import frames
+from switchctl import inputs
+from switchctl import shiny
+from switchctl import timing
+
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
 
-def _press(ser: serial.Serial, s: str, duration: float = .1) -> None:
-    print(f'{s=} {duration=}')
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
-
-
-def _getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
-    _, frame = vid.read()
-    cv2.imshow('game', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        raise SystemExit(0)
-    return frame
-
-
-def _wait_and_render(vid: cv2.VideoCapture, t: float) -> None:
-    end = time.time() + t
-    while time.time() < end:
-        _getframe(vid)
-
-
-def _alarm(ser: serial.Serial, vid: cv2.VideoCapture) -> None:
-    while True:
-        ser.write(b'!')
-        _wait_and_render(vid, .5)
-        ser.write(b'.')
-        _wait_and_render(vid, .5)
-
-
-def _await_pixel(
-        ser: serial.Serial,
-        vid: cv2.VideoCapture,
-        *,
-        x: int,
-        y: int,
-        pixel: tuple[int, int, int],
-        timeout: float = 90,
-) -> None:
-    end = time.time() + timeout
-    frame = _getframe(vid)
-    while not numpy.array_equal(frame[y][x], pixel):
-        frame = _getframe(vid)
-        if time.time() > end:
-            _alarm(ser, vid)
-
-
-def _await_not_pixel(
-        ser: serial.Serial,
-        vid: cv2.VideoCapture,
-        *,
-        x: int,
-        y: int,
-        pixel: tuple[int, int, int],
-        timeout: float = 90,
-) -> None:
-    end = time.time() + timeout
-    frame = _getframe(vid)
-    while numpy.array_equal(frame[y][x], pixel):
-        frame = _getframe(vid)
-        if time.time() > end:
-            _alarm(ser, vid)
-
-
-@contextlib.contextmanager
-def _shh(ser: serial.Serial) -> Generator[None, None, None]:
-    try:
-        yield
-    finally:
-        ser.write(b'.')
-
-
-def main() -> int:
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
-    args = parser.parse_args()
-
-    vid = cv2.VideoCapture(0)
-    vid.set(cv2.CAP_PROP_FRAME_WIDTH, 768)
-    vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-    with serial.Serial(args.serial, 9600) as ser, _shh(ser):
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--sigma', type=float, default=5)
+    parser.add_argument('--calibrate-after', type=int, default=50)
+    parser.add_argument('--stats', default=shiny.STATS_DEFAULT)
+    args = parser.parse_args(argv)
+
+    vid = capture.open(args.video, 768, 480)
+    classifier = shiny.DelayClassifier(
+        shiny.capture_key('regi_reset', args.video, 768, 480),
+        threshold=1,
+        sigma=args.sigma,
+        calibrate_after=args.calibrate_after,
+        stats_file=args.stats,
+    )
+
+    best = None
+    with serial.Serial(args.serial, 9600) as port, inputs.shh(port), \
+            controller.watchdog(port, args.watchdog) as ser:
         while True:
-            _press(ser, 'H')
-            _wait_and_render(vid, 1)
-            _press(ser, 'X')
-            _wait_and_render(vid, 1)
-            _press(ser, 'A')
-            # TODO: we could notice the dialog quicker here
-            _wait_and_render(vid, 3.5)
-            _press(ser, 'A')
-            _wait_and_render(vid, 1)
-            _press(ser, 'A')
-
-            _await_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            phases = {}
+            t = time.monotonic()
+
+            def _phase(name: str) -> None:
+                nonlocal t
+                now = time.monotonic()
+                phases[name] = now - t
+                t = now
+
+            inputs.press(ser, 'H')
+            frames.wait_and_render(vid, 1)
+            inputs.press(ser, 'X')
+            frames.wait_and_render(vid, 1)
+            inputs.press(ser, 'A')
+
+            # closing the game, launching it and picking the user all take A
+            frames.await_pixel(
+                ser, vid, x=5, y=5, pixel=(16, 16, 16), mash='A',
+            )
+            _phase('restart')
 
             print('startup screen!')
-
-            _await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            frames.await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            _phase('startup')
 
             print('after startup!')
-            _wait_and_render(vid, .75)
-            _press(ser, 'A')
+            frames.await_pixel(
+                ser, vid, x=5, y=5, pixel=(16, 16, 16), mash='A',
+            )
+            _phase('title')
 
-            _await_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
-            _await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            frames.await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            _phase('load')
 
             print('game loaded')
-            _wait_and_render(vid, .75)
-            _press(ser, 'A')
-            _wait_and_render(vid, .5)
-            _press(ser, 'A')
-            _wait_and_render(vid, .75)
-            _press(ser, 'A')
-
-            _await_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
+            frames.await_pixel(
+                ser, vid, x=696, y=420, pixel=(59, 59, 59), mash='A',
+            )
+            _phase('approach')
 
             print('dialog started')
 
-            _await_not_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
+            frames.await_not_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
 
             print('dialog ended')
             t0 = time.time()
 
-            _await_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
+            frames.await_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
 
             t1 = time.time()
             print(f'dialog delay: {t1 - t0:.3f}s')
+            _phase('dialog')
 
-            if (t1 - t0) > 1:
+            if classifier.is_shiny(t1 - t0):
                 print('SHINY!!!')
-                _alarm(ser, vid)
+                frames.alarm(ser, vid)
+
+            cycle = sum(phases.values())
+            best = cycle if best is None else min(best, cycle)
+            for name, elapsed in phases.items():
+                timing.record(f'regi {name}', elapsed)
+            print(
+                f'cycle: {cycle:.2f}s (best {best:.2f}s) ' +
+                ' '.join(f'{k}={v:.2f}' for k, v in phases.items()),
+            )
 
     vid.release()
     cv2.destroyAllWindows()
@@ -1,58 +1,174 @@
 from __future__ import annotations
 
 import argparse
+import functools
 import sys
 import time
+from typing import Callable
+from typing import Dict
+from typing import Sequence
+from typing import Tuple
 
 import serial
 
+from switchctl import calibrate
+from switchctl import capture
+from switchctl import controller
+from switchctl import detect
+from switchctl import frames
+from switchctl import inputs
+from switchctl import sprites
+from switchctl.detect import Probe
+
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
+_press = functools.partial(inputs.press, duration=.05, quiet=True)
+
+# probe table labels, see `python -m switchctl.calibrate`
+PROMPT = 'fossil-prompt'  # dialog is waiting for a button
+RECEIVED = 'fossil-received'  # "you received ..."
+NO_FOSSILS = 'fossil-none'  # "you don't have the fossils" or the like
+OVERWORLD = 'overworld'
 
-def _press(ser: serial.Serial, s: str, duration: float = .05) -> None:
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
+Table = Dict[str, Tuple[Probe, ...]]
+Args = argparse.Namespace
+Then = Callable[[controller.Controller, capture.Capture, Args], None]
 
 
-def _beep(ser: serial.Serial) -> None:
+def _beep(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        args: Args,
+) -> None:
     ser.write(b'!')
     time.sleep(.25)
     ser.write(b'.')
 
 
-def main() -> int:
+def _save(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        args: Args,
+) -> None:
+    _press(ser, 'X')
+    frames.wait_and_render(vid, .5)
+    _press(ser, 'A')
+    frames.wait_and_render(vid, 2.4)
+    _press(ser, 'A')
+    frames.wait_and_render(vid, .75)
+    _press(ser, 'A')
+    frames.wait_and_render(vid, 1)
+    _press(ser, 'd')
+
+
+def _box(ser: controller.Controller, vid: capture.Capture, args: Args) -> None:
+    # opens the box the fossils were sent to, for whatever runs next
+    _press(ser, 'X')
+    frames.wait_and_render(vid, .5)
+    _press(ser, 'A')
+    frames.wait_and_render(vid, 1.5)
+    _press(ser, 'R')
+    frames.wait_and_render(vid, 2)
+
+
+def _shiny_check(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        args: Args,
+) -> None:
+    # expects the box open on the first revived fossil, see `box`
+    refs = sprites.References.load(args.sprites)
+    shiny = refs.is_shiny(args.species, sprites.scan(ser, vid, args.count))
+    print(f'checked {len(shiny)}, shiny: {shiny.sum()}')
+    if shiny.any():
+        print(f'SHINY!!! at {[i + 1 for i in shiny.nonzero()[0]]}')
+        frames.alarm(ser, vid)
+
+
+THEN: dict[str, Then] = {
+    'beep': _beep,
+    'box': _box,
+    'save': _save,
+    'shiny-check': _shiny_check,
+}
+
+
+def _revive(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        table: Table,
+        *,
+        timeout: float = 30,
+) -> bool:
+    # false once the fossils ran out
+    end = time.monotonic() + timeout
+    received = False
+    while time.monotonic() < end:
+        frame = frames.getframe(vid)
+        if all(detect.match(frame, table[RECEIVED])):
+            received = True
+        elif received:
+            return True  # counted once the screen moves on
+        elif all(detect.match(frame, table[NO_FOSSILS])):
+            return False
+        # talking to the npc starts the next revive
+        if (
+                all(detect.match(frame, table[PROMPT])) or
+                all(detect.match(frame, table[OVERWORLD]))
+        ):
+            _press(ser, 'A')
+
+    print('revive did not finish')
+    frames.alarm(ser, vid)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
-    parser.add_argument('--count', type=int, default=1)
+    # stop after this many, default until the fossils run out
+    parser.add_argument('--count', type=int)
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
-    args = parser.parse_args()
-
-    with serial.Serial(args.serial, 9600) as ser:
-        for i in range(args.count):
-            print(f'reviving ~#{i + 1}')
-
-            end = time.time() + 17.4
-            while time.time() < end:
-                _press(ser, 'A')
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--probes', default=calibrate.TABLE_DEFAULT)
+    # steps to run once everything is revived, in order
+    parser.add_argument('--then', action='append', choices=THEN)
+    # what the fossils revive into, for shiny-check
+    parser.add_argument('--species')
+    parser.add_argument('--sprites', default=sprites.REFERENCES_DEFAULT)
+    args = parser.parse_args(argv)
+
+    then = args.then or ['save', 'beep']
+    if 'shiny-check' in then and args.species is None:
+        parser.error('shiny-check needs --species')
+
+    table = calibrate.load_table(args.probes)
+    vid = capture.open(args.video, 768, 480)
+
+    with serial.Serial(args.serial, 9600) as port, \
+            controller.watchdog(port, args.watchdog) as ser:
+        revived = 0
+        while args.count is None or revived < args.count:
+            t0 = time.monotonic()
+            if not _revive(ser, vid, table):
+                print('out of fossils')
+                break
+            revived += 1
+            print(f'revived #{revived} in {time.monotonic() - t0:.1f}s')
+        print(f'revived {revived}')
+        # what the steps after this go by
+        args.count = revived
 
         print('backing out')
-        end = time.time() + 5
-        while time.time() < end:
+        end = time.monotonic() + 10
+        while not all(detect.match(frames.getframe(vid), table[OVERWORLD])):
+            if time.monotonic() > end:
+                frames.alarm(ser, vid)
             _press(ser, 'B')
 
-        _press(ser, 'X')
-        time.sleep(.5)
-        _press(ser, 'A')
-        time.sleep(2.4)
-        _press(ser, 'A')
-        time.sleep(.75)
-        _press(ser, 'A')
-        time.sleep(1)
-        _press(ser, 'd')
-
-        _beep(ser)
+        for name in then:
+            THEN[name](ser, vid, args)
 
+    vid.release()
     return 0
 
 
@@ -1,168 +1,200 @@
 from __future__ import annotations
 
 import argparse
-import contextlib
+import functools
+import math
 import sys
 import time
-from typing import Generator
+from typing import Sequence
 
 import cv2
 import numpy
 import serial
 
+from switchctl import alarm
+from switchctl import capture
+from switchctl import controller
+from switchctl import detect
+from switchctl import frames
+from switchctl import inputs
+from switchctl import shiny
+
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
+_press = functools.partial(inputs.press, duration=.05)
 
-def _press(ser: serial.Serial, s: str, duration: float = .05) -> None:
-    print(f'{s=} {duration=}')
-    ser.write(s.encode())
-    time.sleep(duration)
-    ser.write(b'0')
-    time.sleep(.075)
+RHYTHM = alarm.PATTERNS['rhythm']
 
+# purple of the overworld sinistea in opencv hsv (h is 0-180)
+TARGET_LO = (125, 80, 60)
+TARGET_HI = (160, 255, 255)
+TARGET_MIN_AREA = 40
+# where the player stands in a 768x480 capture
+PLAYER = (384, 300)
+# stick letters by direction, counter-clockwise from the right
+DIRECTIONS = 'dewqazsc'
+# the battle dialog box
+DIALOG = detect.Probe(696, 420, (59, 59, 59))
 
-def _getframe(vid: cv2.VideoCapture) -> numpy.ndarray:
-    _, frame = vid.read()
-    cv2.imshow('game', frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        raise SystemExit(0)
-    return frame
 
+def _find_target(frame: numpy.ndarray) -> tuple[int, int] | None:
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = cv2.inRange(hsv, TARGET_LO, TARGET_HI)
+    n, _, stats, centroids = cv2.connectedComponentsWithStats(mask)
+    # label 0 is the background
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    if n <= 1 or areas.max() < TARGET_MIN_AREA:
+        return None
+    x, y = centroids[1 + areas.argmax()]
+    return int(x), int(y)
 
-def _wait_and_render(vid: cv2.VideoCapture, t: float) -> None:
-    end = time.time() + t
-    while time.time() < end:
-        _getframe(vid)
 
+def _steer(target: tuple[int, int]) -> bytes:
+    dx, dy = target[0] - PLAYER[0], PLAYER[1] - target[1]
+    octant = round(math.atan2(dy, dx) / (math.pi / 4)) % 8
+    return DIRECTIONS[octant].encode()
 
-def _alarm(ser: serial.Serial, vid: cv2.VideoCapture) -> None:
-    while True:
-        ser.write(b'!')
-        _wait_and_render(vid, .2)
-        ser.write(b'.')
-        _wait_and_render(vid, .05)
-        ser.write(b'!')
-        _wait_and_render(vid, .075)
-        ser.write(b'.')
-        _wait_and_render(vid, .075)
-        ser.write(b'!')
-        _wait_and_render(vid, .075)
-        ser.write(b'.')
-        _wait_and_render(vid, .075)
-        ser.write(b'!')
-        _wait_and_render(vid, .2)
-        ser.write(b'.')
-        _wait_and_render(vid, .075)
-        ser.write(b'!')
-        _wait_and_render(vid, .2)
-        ser.write(b'.')
-        _wait_and_render(vid, .075)
-
-
-def _await_pixel(
-        ser: serial.Serial,
-        vid: cv2.VideoCapture,
-        *,
-        x: int,
-        y: int,
-        pixel: tuple[int, int, int],
-        timeout: float = 90,
-) -> None:
-    end = time.time() + timeout
-    frame = _getframe(vid)
-    while not numpy.array_equal(frame[y][x], pixel):
-        frame = _getframe(vid)
-        if time.time() > end:
-            _alarm(ser, vid)
 
+def _thumb(frame: numpy.ndarray) -> numpy.ndarray:
+    small = cv2.resize(frame, (96, 60), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(numpy.int16)
 
-def _await_not_pixel(
-        ser: serial.Serial,
-        vid: cv2.VideoCapture,
+
+def _transition(prev: numpy.ndarray, thumb: numpy.ndarray) -> bool:
+    # the battle swirl changes most of the screen from one frame to the next
+    return numpy.abs(thumb - prev).mean() > 50
+
+
+def _search(
+        ser: controller.Controller,
+        vid: capture.Capture,
         *,
-        x: int,
-        y: int,
-        pixel: tuple[int, int, int],
         timeout: float = 90,
 ) -> None:
-    end = time.time() + timeout
-    frame = _getframe(vid)
-    while numpy.array_equal(frame[y][x], pixel):
-        frame = _getframe(vid)
-        if time.time() > end:
-            _alarm(ser, vid)
+    held = b'a'
+    ser.write(held)
+    left = True
+    t_end = time.monotonic() + .65
+    end = time.monotonic() + timeout
 
-
-@contextlib.contextmanager
-def _shh(ser: serial.Serial) -> Generator[None, None, None]:
-    try:
-        yield
-    finally:
-        ser.write(b'.')
+    prev = _thumb(frames.getframe(vid))
+    while True:
+        frame = frames.getframe(vid)
+        thumb = _thumb(frame)
+        # the dialog in case the swirl went by between two frames
+        if _transition(prev, thumb) or all(detect.match(frame, (DIALOG,))):
+            break
+        elif time.monotonic() > end:
+            ser.write(b'0')
+            print('no battle started')
+            frames.alarm(ser, vid, RHYTHM)
+        prev = thumb
+
+        target = _find_target(frame)
+        if target is not None:
+            want = _steer(target)
+        else:
+            # nothing in sight: criss-cross
+            if time.monotonic() > t_end:
+                left = not left
+                t_end = time.monotonic() + .65
+            want = b'a' if left else b'd'
+
+        if want != held:
+            ser.write(want)
+            held = want
+    ser.write(b'0')
 
 
-def main() -> int:
+def _await_overworld(
+        ser: controller.Controller,
+        vid: capture.Capture,
+        *,
+        timeout: float = 10,
+) -> None:
+    # leaving the battle fades to black and back
+    end = time.monotonic() + timeout
+    dark = False
+    while time.monotonic() < end:
+        brightness = _thumb(frames.getframe(vid)).mean()
+        if brightness < 20:
+            dark = True
+        elif dark:
+            return
+    print('did not make it back to the overworld')
+    frames.alarm(ser, vid, RHYTHM)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
-    args = parser.parse_args()
-
-    vid = cv2.VideoCapture(0)
-    vid.set(cv2.CAP_PROP_FRAME_WIDTH, 768)
-    vid.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-    with serial.Serial(args.serial, 9600) as ser, _shh(ser):
+    parser.add_argument('--watchdog', type=float)
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--sigma', type=float, default=5)
+    parser.add_argument('--calibrate-after', type=int, default=50)
+    parser.add_argument('--stats', default=shiny.STATS_DEFAULT)
+    args = parser.parse_args(argv)
+
+    vid = capture.open(args.video, 768, 480)
+    classifier = shiny.DelayClassifier(
+        shiny.capture_key('sinistea', args.video, 768, 480),
+        threshold=1,
+        sigma=args.sigma,
+        calibrate_after=args.calibrate_after,
+        stats_file=args.stats,
+    )
+
+    with serial.Serial(args.serial, 9600) as port, inputs.shh(port), \
+            controller.watchdog(port, args.watchdog) as ser:
         while True:
             # TODO: auto-detect the "game has been interrupted" screen
-            # _await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
+            # frames.await_not_pixel(ser, vid, x=5, y=5, pixel=(16, 16, 16))
 
             print('orienting to the right')
             ser.write(b'd')
-            _wait_and_render(vid, 1.3)
+            frames.wait_and_render(vid, 1.3)
             ser.write(b'0')
-            _wait_and_render(vid, .1)
+            frames.wait_and_render(vid, .1)
             print('slightly down-left')
             ser.write(b'z')
-            _wait_and_render(vid, .3)
+            frames.wait_and_render(vid, .3)
             ser.write(b'0')
 
-            print('criss-cross!')
-
-            ser.write(b'a')
-            left = True
-            t_end = time.time() + .65
-
-            frame = _getframe(vid)
-            while not numpy.array_equal(frame[420][696], (59, 59, 59)):
-                if time.time() > t_end:
-                    ser.write(b'd' if left else b'a')
-                    left = not left
-                    t_end = time.time() + .65
-
-                frame = _getframe(vid)
-            ser.write(b'0')
+            print('searching')
+            _search(ser, vid)
+            print('battle started')
 
+            frames.await_pixel(
+                ser, vid, x=696, y=420, pixel=(59, 59, 59), pattern=RHYTHM,
+            )
             print('dialog started')
 
-            _await_not_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
+            frames.await_not_pixel(
+                ser, vid, x=696, y=420, pixel=(59, 59, 59), pattern=RHYTHM,
+            )
 
             print('dialog ended')
             t0 = time.time()
 
-            _await_pixel(ser, vid, x=696, y=420, pixel=(59, 59, 59))
+            frames.await_pixel(
+                ser, vid, x=696, y=420, pixel=(59, 59, 59), pattern=RHYTHM,
+            )
 
             t1 = time.time()
             print(f'dialog delay: {t1 - t0:.3f}s')
 
-            if (t1 - t0) > 1:
+            if classifier.is_shiny(t1 - t0):
                 print('SHINY!!!')
-                _alarm(ser, vid)
+                frames.alarm(ser, vid, RHYTHM)
 
-            _await_pixel(ser, vid, x=686, y=289, pixel=(16, 16, 16))
-            _wait_and_render(vid, .05)
+            frames.await_pixel(
+                ser, vid, x=686, y=289, pixel=(16, 16, 16), pattern=RHYTHM,
+            )
+            frames.wait_and_render(vid, .05)
             _press(ser, 'w')
             _press(ser, 'A')
-            _wait_and_render(vid, 4.5)
-            print('run complete?')
+            _await_overworld(ser, vid)
+            print('run complete!')
 
     vid.release()
     cv2.destroyAllWindows()
@@ -1,34 +1,120 @@
 from __future__ import annotations
 
 import argparse
-import os.path
+import contextlib
+import datetime
+import os
+import stat
 import sys
+import threading
+import time
+from typing import BinaryIO
+from typing import Generator
 
 import serial
 
 SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
 
+_output_lock = threading.Lock()
+
+
+def _output(line: bytes, record: BinaryIO | None) -> None:
+    ts = datetime.datetime.now().strftime('%H:%M:%S.%f')[:-3].encode()
+    line = b'[' + ts + b'] ' + line + b'\n'
+    with _output_lock:
+        sys.stdout.buffer.write(line)
+        sys.stdout.buffer.flush()
+        if record is not None:
+            record.write(line)
+            record.flush()
+
+
+def _fifo_commands(path: str) -> Generator[bytes, None, None]:
+    if not os.path.exists(path):
+        os.mkfifo(path)
+    elif not stat.S_ISFIFO(os.stat(path).st_mode):
+        raise SystemExit(f'{path} exists and is not a fifo')
+
+    fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+    os.set_blocking(fd, True)
+    # hold a writer open so the fifo doesn't report eof between commands
+    keepalive = os.open(path, os.O_WRONLY)
+    try:
+        while True:
+            yield os.read(fd, 4096)
+    finally:
+        os.close(keepalive)
+        os.close(fd)
+        os.remove(path)
+
+
+# windows has no fifos: a plain file is picked up and removed once written
+def _file_commands(path: str) -> Generator[bytes, None, None]:
+    while True:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                contents = f.read()
+            os.remove(path)
+            yield contents
+        else:
+            time.sleep(.05)
+
+
+def _read_serial(
+        ser: serial.Serial,
+        record: BinaryIO | None,
+        stop: threading.Event,
+) -> None:
+    pending = b''
+    while not stop.is_set():
+        pending += ser.read(ser.in_waiting or 1)
+        *lines, pending = pending.split(b'\n')
+        for line in lines:
+            _output(line.rstrip(b'\r'), record)
+    if pending:
+        _output(pending, record)
+
 
 def main() -> int:
     parser = argparse.ArgumentParser()
     parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--fifo', default='f')
+    parser.add_argument('--record')
     args = parser.parse_args()
 
-    with serial.Serial(args.serial, 9600) as ser:
+    if hasattr(os, 'mkfifo'):
+        commands = _fifo_commands(args.fifo)
+    else:
+        commands = _file_commands(args.fifo)
+
+    with contextlib.ExitStack() as ctx:
+        ser = ctx.enter_context(serial.Serial(args.serial, 9600, timeout=.1))
+        if args.record:
+            record = ctx.enter_context(open(args.record, 'ab'))
+        else:
+            record = None
+        ctx.callback(commands.close)
+
+        stop = threading.Event()
+        reader = threading.Thread(
+            target=_read_serial,
+            args=(ser, record, stop),
+            name='serial-reader',
+            daemon=True,
+        )
+        reader.start()
+        ctx.callback(reader.join)
+        ctx.callback(stop.set)
+
+        print(f'write commands to {args.fifo}, e.g. `printf A > {args.fifo}`')
         ser.write(b'V')
-        while True:
-            if os.path.exists('f'):
-                with open('f', 'rb') as f:
-                    contents = f.read()
-                os.remove('f')
+
+        try:
+            for contents in commands:
                 ser.write(contents)
-                sys.stdout.buffer.write(b'> send: ')
-                sys.stdout.buffer.write(contents)
-                sys.stdout.buffer.write(b'\n')
-                sys.stdout.buffer.flush()
-            elif ser.in_waiting:
-                sys.stdout.buffer.write(ser.read())
-                sys.stdout.buffer.flush()
+                _output(b'> send: ' + contents, record)
+        except KeyboardInterrupt:
+            pass
     return 0
 
 
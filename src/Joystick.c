@@ -1,6 +1,7 @@
 #include "Joystick.h"
 #include "Bot.h"
 #include <LUFA/Drivers/Peripheral/Serial.h>
+#include <util/atomic.h>
 
 typedef enum {
     SYNC_CONTROLLER,
@@ -22,6 +23,34 @@ const __flash command STARTUP[] = {
 };
 const int STARTUP_LENGTH = sizeof(STARTUP) / sizeof(command);
 
+// buzzer pattern: alternating on / off durations in units of 10ms
+#define PATTERN_MAX 16
+uint8_t pattern[PATTERN_MAX * 2];
+uint8_t pattern_len = 0;
+uint8_t pattern_pos = 0;
+uint32_t pattern_next = 0;
+
+// once the host sends a heartbeat ('~'), the report goes back to empty after
+// watchdog_ms without any byte from it.  'W' <timeout in 10ms units> sets
+// the timeout and arms it too, 'W' 0 turns it off again
+bool watchdog = false;
+uint16_t watchdog_ms = 1000;
+uint32_t host_seen = 0;
+
+volatile uint32_t ms = 0;
+
+ISR(TIMER0_COMPA_vect) {
+    ms += 1;
+}
+
+uint32_t millis(void) {
+    uint32_t ret;
+    ATOMIC_BLOCK(ATOMIC_RESTORESTATE) {
+        ret = ms;
+    }
+    return ret;
+}
+
 void AS_Serial_SendString(char* s) {
     for (int i = 0; i < strlen(s); i += 1) {
         Serial_SendByte(s[i]);
@@ -42,6 +71,12 @@ void SetupHardware(void) {
     DDRB = 1 << 5;
     PORTB = 0;
 
+    // 1ms tick: 16MHz / 64 / 250
+    TCCR0A = 1 << WGM01;
+    TCCR0B = (1 << CS01) | (1 << CS00);
+    OCR0A = 249;
+    TIMSK0 = 1 << OCIE0A;
+
     // The USB stack should be initialized last.
     Serial_Init(9600, 0);
     AS_Serial_SendString("hello hello world\n");
@@ -333,19 +368,60 @@ int main(void) {
     // listen for inputs and react
     bool verbose = false;
     char c = '0';
+    // 'p' <count> <on> <off> ...: bytes of a pattern still to be received
+    bool pattern_count = false;
+    uint8_t pattern_remaining = 0;
+    // 'W' <timeout>: the timeout byte is still to be received
+    bool watchdog_timeout = false;
     for (;;) {
         if (Serial_IsCharReceived()) {
             char read = Serial_ReceiveByte();
-            if (read == 'V') {
+            host_seen = millis();
+            if (watchdog_timeout) {
+                watchdog_timeout = false;
+                uint8_t timeout = read;
+                watchdog = timeout != 0;
+                if (watchdog) {
+                    watchdog_ms = timeout * 10;
+                }
+            } else if (pattern_count) {
+                pattern_count = false;
+                uint8_t count = read;
+                if (count == 0 || count > PATTERN_MAX) {
+                    pattern_len = 0;
+                } else {
+                    pattern_len = count * 2;
+                    pattern_remaining = pattern_len;
+                }
+            } else if (pattern_remaining) {
+                pattern[pattern_len - pattern_remaining] = read;
+                pattern_remaining -= 1;
+                if (!pattern_remaining) {
+                    pattern_pos = 0;
+                    pattern_next = millis();
+                    if (verbose) {
+                        AS_Serial_SendString("pattern uploaded\n");
+                    }
+                }
+            } else if (read == 'p') {
+                pattern_count = true;
+                pattern_len = 0;
+            } else if (read == 'V') {
                 verbose = true;
                 AS_Serial_SendString("enabling verbose mode\n");
             } else if (read == 'v') {
                 verbose = false;
                 AS_Serial_SendString("disabling verbose mode\n");
             } else if (read == '!') {
+                pattern_len = 0;
                 PORTB = 1 << 5;
             } else if (read == '.') {
+                pattern_len = 0;
                 PORTB = 0x00;
+            } else if (read == '~') {
+                watchdog = true;
+            } else if (read == 'W') {
+                watchdog_timeout = true;
             } else {
                 c = read;
                 if (verbose) {
@@ -356,6 +432,22 @@ int main(void) {
             }
         }
 
+        if (pattern_len && !pattern_remaining) {
+            uint32_t now = millis();
+            if ((int32_t)(now - pattern_next) >= 0) {
+                PORTB = pattern_pos % 2 == 0 ? 1 << 5 : 0x00;
+                pattern_next = now + pattern[pattern_pos] * 10UL;
+                pattern_pos = (pattern_pos + 1) % pattern_len;
+            }
+        }
+
+        if (watchdog && c != '0' && millis() - host_seen > watchdog_ms) {
+            c = '0';
+            if (verbose) {
+                AS_Serial_SendString("watchdog: host silent, neutral\n");
+            }
+        }
+
         HID_Task(c);
         USB_USBTask();
     }
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from typing import Tuple
+
+from switchctl.controller import Controller
+from switchctl.controller import SerialLike
+
+# (on, off) durations in seconds, played in a loop
+Pattern = Tuple[Tuple[float, float], ...]
+
+PATTERNS: dict[str, Pattern] = {
+    'default': ((.5, .5),),
+    'rhythm': ((.2, .05), (.075, .075), (.075, .075), (.2, .075), (.2, .075)),
+    'beep': ((.25, 2),),
+}
+
+# must match PATTERN_MAX in Joystick.c
+PATTERN_MAX = 16
+
+
+def encode(pattern: Pattern) -> bytes:
+    if not 0 < len(pattern) <= PATTERN_MAX:
+        raise ValueError(f'pattern must have 1-{PATTERN_MAX} steps')
+    ret = bytearray((ord('p'), len(pattern)))
+    for step in pattern:
+        for t in step:
+            # the firmware counts in 10ms units
+            ret.append(min(max(round(t * 100), 1), 255))
+    return bytes(ret)
+
+
+class Alarm:
+    def __init__(self, ser: SerialLike) -> None:
+        self.ser = ser
+
+    def stop(self) -> None:
+        self.ser.write(b'.')
+
+
+# plays on the caller's controller, a controller of its own would never be
+# closed and would reset the watchdog of the caller's
+class _HostAlarm(Alarm):
+    def __init__(self, ctl: Controller, pattern: Pattern) -> None:
+        super().__init__(ctl)
+        self._ctl = ctl
+        self._steps = [
+            (data, t)
+            for on, off in pattern
+            for data, t in ((b'!', on), (b'.', off))
+        ]
+        self._i = 0
+        self._stopped = False
+        self._ctl.call_later(0, self._step)
+
+    def _step(self) -> None:
+        if self._stopped:
+            return
+        data, t = self._steps[self._i]
+        self._i = (self._i + 1) % len(self._steps)
+        self._ctl.write(data)
+        self._ctl.call_later(t, self._step)
+
+    def stop(self) -> None:
+        self._stopped = True
+        self._ctl.write(b'.')
+
+
+def start(
+        ser: SerialLike,
+        pattern: Pattern = PATTERNS['default'],
+        *,
+        firmware: bool | None = None,
+) -> Alarm:
+    # older firmware would read the pattern bytes as button presses, so
+    # playing on the microcontroller is opt-in
+    if firmware is None:
+        firmware = os.environ.get('alarm_firmware') == '1'
+
+    if firmware:
+        ser.write(encode(pattern))
+        return Alarm(ser)
+    elif isinstance(ser, Controller):
+        return _HostAlarm(ser, pattern)
+    else:
+        raise TypeError(
+            'playing on the host needs a Controller, '
+            'see `controller.watchdog`',
+        )
+
+
+SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
+
+
+def main() -> int:
+    import serial
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--firmware', action='store_true')
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument('pattern', choices=PATTERNS, nargs='?', default='default')
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as ctx:
+        ser: SerialLike = ctx.enter_context(serial.Serial(args.serial, 9600))
+        if not args.firmware:
+            ser = ctx.enter_context(Controller(ser))
+        alarm = start(ser, PATTERNS[args.pattern], firmware=args.firmware)
+        try:
+            time.sleep(args.duration)
+        finally:
+            alarm.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import capture
+from switchctl import frames
+from switchctl.detect import Probe
+
+if TYPE_CHECKING:
+    import numpy
+
+TABLE_DEFAULT = 'probes.json'
+
+
+def load_table(path: str = TABLE_DEFAULT) -> dict[str, tuple[Probe, ...]]:
+    with open(path) as f:
+        contents = json.load(f)
+    return {
+        label: tuple(
+            Probe(p['x'], p['y'], tuple(p['pixel']), p['tolerance'])
+            for p in probes
+        )
+        for label, probes in contents.items()
+    }
+
+
+def _save_table(path: str, table: dict[str, tuple[Probe, ...]]) -> None:
+    if os.path.exists(path):
+        with open(path) as f:
+            contents = json.load(f)
+    else:
+        contents = {}
+    for label, probes in table.items():
+        contents[label] = [probe._asdict() for probe in probes]
+    with open(path, 'w') as f:
+        json.dump(contents, f, indent=2)
+        f.write('\n')
+
+
+def _load_frames(directory: str) -> numpy.ndarray:
+    import cv2
+    import numpy
+
+    paths = sorted(glob.glob(os.path.join(directory, '*.png')))
+    if not paths:
+        raise SystemExit(f'no frames in {directory}')
+    return numpy.stack([cv2.imread(path) for path in paths])
+
+
+# picks the fewest pixels that all match in every positive frame while at
+# least one of them fails in every negative frame.  candidates are sampled
+# every `stride` pixels and each tolerance sits halfway between the worst
+# positive and the nearest negative, with `min_margin` of room on both sides
+def build(
+        positive: numpy.ndarray,
+        negative: numpy.ndarray,
+        *,
+        stride: int = 2,
+        min_margin: float = 8,
+        max_probes: int = 4,
+) -> tuple[Probe, ...]:
+    import numpy
+
+    pos = positive[:, ::stride, ::stride].astype(numpy.float32)
+    neg = negative[:, ::stride, ::stride].astype(numpy.float32)
+
+    center = numpy.round(pos.mean(axis=0))
+    pos_worst = numpy.sqrt(((pos - center) ** 2).sum(axis=-1)).max(axis=0)
+    # (negatives, h, w): does this pixel reject this negative frame
+    neg_dist = numpy.sqrt(((neg - center) ** 2).sum(axis=-1))
+    rejects = neg_dist > pos_worst + 2 * min_margin
+
+    probes = []
+    remaining = numpy.ones(len(neg), bool)
+    while remaining.any() and len(probes) < max_probes:
+        counts = rejects[remaining].sum(axis=0)
+        if counts.max() == 0:
+            break
+        # among the pixels rejecting the most frames prefer the steadiest
+        best = numpy.where(counts == counts.max(), pos_worst, numpy.inf)
+        y, x = numpy.unravel_index(best.argmin(), best.shape)
+
+        nearest = neg_dist[rejects[:, y, x], y, x].min()
+        cutoff = (pos_worst[y, x] + nearest) / 2
+        b, g, r = (int(c) for c in center[y, x])
+        probe = Probe(
+            int(x) * stride,
+            int(y) * stride,
+            (b, g, r),
+            int(cutoff ** 2) + 1,
+        )
+        probes.append(probe)
+        remaining &= ~rejects[:, y, x]
+
+    if remaining.any():
+        raise ValueError(
+            f'{remaining.sum()} negative frames could not be told apart '
+            f'with {max_probes} probes',
+        )
+    return tuple(probes)
+
+
+def _record(args: argparse.Namespace) -> int:
+    import cv2
+
+    os.makedirs(args.dest, exist_ok=True)
+    vid = capture.open(args.video, args.width, args.height)
+    for i in range(args.count):
+        frame = frames.getframe(vid)
+        cv2.imwrite(os.path.join(args.dest, f'{time.time():.3f}.png'), frame)
+        print(f'recorded {i + 1}/{args.count}')
+        frames.wait_and_render(vid, args.interval)
+    vid.release()
+    return 0
+
+
+def _build(args: argparse.Namespace) -> int:
+    import numpy
+
+    positive = _load_frames(args.positive)
+    negative = numpy.concatenate([_load_frames(d) for d in args.negative])
+
+    probes = build(
+        positive,
+        negative,
+        stride=args.stride,
+        min_margin=args.min_margin,
+        max_probes=args.max_probes,
+    )
+    for probe in probes:
+        print(probe)
+    _save_table(args.table, {args.label: probes})
+    return 0
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record')
+    record_parser.add_argument('dest')
+    record_parser.add_argument('--video', type=int, default=0)
+    record_parser.add_argument('--width', type=int, default=768)
+    record_parser.add_argument('--height', type=int, default=480)
+    record_parser.add_argument('--count', type=int, default=20)
+    record_parser.add_argument('--interval', type=float, default=.5)
+
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('label')
+    # directories of frames the label is and is not
+    build_parser.add_argument('positive')
+    build_parser.add_argument('negative', nargs='+')
+    build_parser.add_argument('--table', default=TABLE_DEFAULT)
+    build_parser.add_argument('--stride', type=int, default=2)
+    build_parser.add_argument('--min-margin', type=float, default=8)
+    build_parser.add_argument('--max-probes', type=int, default=4)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        return _record(args)
+    else:
+        return _build(args)
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+from typing import NamedTuple
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
+
+
+class Frame(NamedTuple):
+    seq: int
+    t: float
+    image: numpy.ndarray
+
+
+# grabs frames on a background thread so consumers only ever see the newest
+# one instead of whatever has queued up inside the driver
+class Capture:
+    def __init__(self, index: int, width: int, height: int) -> None:
+        import cv2
+
+        self.index = index
+        self._vid = cv2.VideoCapture(index)
+        self._vid.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self._vid.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self._cond = threading.Condition()
+        self._frame: Frame | None = None
+        self._last_read = -1
+        self._refs = 0
+        self._hooks: tuple[Callable[[Frame], None], ...] = ()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f'capture-{index}',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        seq = 0
+        while not self._closed:
+            ok, image = self._vid.read()
+            if not ok:
+                time.sleep(.01)
+                continue
+            frame = Frame(seq, time.monotonic(), image)
+            # before anyone waiting on the frame is woken up
+            for hook in self._hooks:
+                hook(frame)
+            with self._cond:
+                self._frame = frame
+                self._cond.notify_all()
+            seq += 1
+        self._vid.release()
+
+    # `hook` is called with every frame on the capture thread, it has to be
+    # quick or it delays the frames behind it
+    def add_hook(self, hook: Callable[[Frame], None]) -> None:
+        with self._cond:
+            self._hooks = (*self._hooks, hook)
+
+    def remove_hook(self, hook: Callable[[Frame], None]) -> None:
+        with self._cond:
+            self._hooks = tuple(h for h in self._hooks if h != hook)
+
+    def latest(self) -> Frame | None:
+        return self._frame
+
+    def next_frame(self, after: int = -1, timeout: float = 1) -> Frame:
+        with self._cond:
+            ok = self._cond.wait_for(
+                lambda: self._frame is not None and self._frame.seq > after,
+                timeout=timeout,
+            )
+            if not ok or self._frame is None:
+                raise TimeoutError(f'no frame from video {self.index}')
+            return self._frame
+
+    def read(self) -> tuple[bool, numpy.ndarray]:
+        # same shape as cv2.VideoCapture.read but never returns a frame twice
+        frame = self.next_frame(self._last_read)
+        self._last_read = frame.seq
+        return True, frame.image
+
+    def release(self) -> None:
+        with _lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            _captures.pop(self.index, None)
+        self._closed = True
+        self._thread.join()
+
+
+_lock = threading.Lock()
+_captures: dict[int, Capture] = {}
+
+
+def open(index: int, width: int, height: int) -> Capture:
+    # consoles in one process share the capture for a device
+    with _lock:
+        capture = _captures.get(index)
+        if capture is None:
+            capture = _captures[index] = Capture(index, width, height)
+        capture._refs += 1
+        return capture
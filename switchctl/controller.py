@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+from types import TracebackType
+from typing import Callable
+from typing import Generator
+from typing import Protocol
+
+
+class SerialLike(Protocol):
+    def write(self, data: bytes) -> int | None: ...
+
+
+def encode_watchdog(timeout: float) -> bytes:
+    # the firmware counts in 10ms units, 0 turns its watchdog off
+    return bytes((ord('W'), min(max(round(timeout * 100), 0), 255)))
+
+
+# serializes writes to the microcontroller and runs timed writes on a
+# scheduling thread so the caller can keep processing frames.  with a
+# `watchdog` timeout the firmware releases everything once the heartbeats
+# stop, so a script dying halfway through a press can't leave it held.
+# without one the watchdog is turned off, whatever an earlier run left armed
+# (inside a controller with one, until its next heartbeat re-arms it)
+class Controller:
+    def __init__(
+            self,
+            ser: SerialLike,
+            *,
+            watchdog: float | None = None,
+    ) -> None:
+        self.ser = ser
+        self.watchdog = watchdog
+        self._write_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._heap: list[tuple[float, int, Callable[[], None]]] = []
+        self._seq = itertools.count()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name='controller',
+            daemon=True,
+        )
+        self._thread.start()
+        self.write(encode_watchdog(watchdog or 0))
+        if watchdog is not None:
+            self._heartbeat()
+
+    def _heartbeat(self) -> None:
+        assert self.watchdog is not None
+        self.write(b'~')
+        self.call_later(self.watchdog / 4, self._heartbeat)
+
+    def write(self, data: bytes) -> None:
+        with self._write_lock:
+            self.ser.write(data)
+
+    def call_at(self, when: float, func: Callable[[], None]) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), func))
+            self._cond.notify()
+
+    def call_later(self, delay: float, func: Callable[[], None]) -> None:
+        self.call_at(time.monotonic() + delay, func)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if not self._heap:
+                        self._cond.wait()
+                    else:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._cond.wait(timeout)
+                if self._closed:
+                    return
+                _, _, func = heapq.heappop(self._heap)
+            func()
+
+    # leaving the watchdog armed lets the firmware release whatever the
+    # caller was in the middle of when it crashed
+    def close(self, *, disarm: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._cond.notify()
+        self._thread.join()
+        if self.watchdog is not None and disarm:
+            self.write(encode_watchdog(0))
+
+    def __enter__(self) -> Controller:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        # quitting (`q`, ctrl-c) is not a crash
+        self.close(
+            disarm=(
+                exc_type is None or
+                issubclass(exc_type, (SystemExit, KeyboardInterrupt))
+            ),
+        )
+
+
+# heartbeats for scripts writing to the serial port directly.  with
+# `timeout` None it only turns off a watchdog an earlier run left armed
+@contextlib.contextmanager
+def watchdog(
+        ser: SerialLike,
+        timeout: float | None,
+) -> Generator[Controller, None, None]:
+    with Controller(ser, watchdog=timeout) as ctl:
+        yield ctl
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import socketserver
+import sys
+import threading
+from types import TracebackType
+from typing import Sequence
+
+from switchctl import inputs
+from switchctl.controller import Controller
+
+SERIAL_DEFAULT = 'COM1' if sys.platform == 'win32' else '/dev/ttyUSB0'
+SOCKET_DEFAULT = os.environ.get(
+    'switchctl_socket',
+    f'/tmp/switchctl-{os.getuid()}.sock' if hasattr(os, 'getuid') else '',
+)
+
+# protocol: one request per line, answered by `ok` or `error <message>`
+#
+#   write <hex bytes>                   write raw bytes to the device
+#   press <hex bytes> <duration> <release>
+#
+# a press holds the device for its whole duration so presses from different
+# clients never interleave
+
+
+class Client:
+    def __init__(self, path: str = SOCKET_DEFAULT) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._rfile = self._sock.makefile('rb')
+
+    def _request(self, line: str) -> None:
+        self._sock.sendall(f'{line}\n'.encode())
+        reply = self._rfile.readline().decode().rstrip('\n')
+        if not reply:
+            raise ConnectionError('daemon closed the connection')
+        elif reply != 'ok':
+            raise ValueError(reply.partition(' ')[2])
+
+    def write(self, data: bytes) -> None:
+        self._request(f'write {data.hex()}')
+
+    def press(
+            self,
+            s: str,
+            duration: float = .1,
+            *,
+            release: float = .075,
+    ) -> None:
+        self._request(f'press {s.encode().hex()} {duration} {release}')
+
+    def close(self) -> None:
+        self._rfile.close()
+        self._sock.close()
+
+    def __enter__(self) -> Client:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, controller: Controller) -> None:
+        self.controller = controller
+        self.press_lock = threading.Lock()
+        super().__init__(path, _Handler)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: _Server
+
+    def _handle_line(self, line: bytes) -> None:
+        cmd, *args = line.decode().split()
+        if cmd == 'write' and len(args) == 1:
+            with self.server.press_lock:
+                self.server.controller.write(bytes.fromhex(args[0]))
+        elif cmd == 'press' and len(args) == 3:
+            s = bytes.fromhex(args[0]).decode()
+            duration, release = float(args[1]), float(args[2])
+            with self.server.press_lock:
+                inputs.press(
+                    self.server.controller,
+                    s,
+                    duration,
+                    release=release,
+                    quiet=True,
+                )
+        else:
+            raise ValueError(f'bad request: {line!r}')
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                self._handle_line(line)
+            except ValueError as e:
+                self.wfile.write(f'error {e}\n'.encode())
+            else:
+                self.wfile.write(b'ok\n')
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serial', default=SERIAL_DEFAULT)
+    parser.add_argument('--socket', default=SOCKET_DEFAULT)
+    # seconds of silence before the firmware releases everything, off if unset
+    parser.add_argument('--watchdog', type=float)
+    args = parser.parse_args(argv)
+
+    import serial
+
+    if os.path.exists(args.socket):
+        try:
+            Client(args.socket).close()
+        except ConnectionRefusedError:
+            os.remove(args.socket)  # left over from a daemon that died
+        else:
+            print(f'already running on {args.socket}', file=sys.stderr)
+            return 1
+
+    with serial.Serial(args.serial, 9600) as ser, \
+            Controller(ser, watchdog=args.watchdog) as ctrl:
+        old_umask = os.umask(0o077)
+        try:
+            server = _Server(args.socket, ctrl)
+        finally:
+            os.umask(old_umask)
+
+        print(f'listening on {args.socket}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            os.remove(args.socket)
+            with server.press_lock:
+                ctrl.write(b'0.')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
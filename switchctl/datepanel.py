@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import argparse
+import calendar
+import datetime
+import itertools
+import os
+import time
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import capture
+from switchctl import detect
+from switchctl import frames
+from switchctl import inputs
+from switchctl import plan
+from switchctl.capture import Capture
+from switchctl.controller import SerialLike
+from switchctl.detect import Probe
+
+if TYPE_CHECKING:
+    import numpy
+
+DIGITS_DEFAULT = 'digits.npz'
+
+# the "Date and Time" panel of a 1280x720 capture, US layout (MM/DD/YYYY),
+# (x, y, w, h) of each digit cell in a field
+FIELDS = {
+    'month': ((236, 334, 26, 44), (262, 334, 26, 44)),
+    'day': ((386, 334, 26, 44), (412, 334, 26, 44)),
+    'year': (
+        (524, 334, 26, 44),
+        (550, 334, 26, 44),
+        (576, 334, 26, 44),
+        (602, 334, 26, 44),
+    ),
+}
+# cursor order of the fields, left to right
+ORDER = ('month', 'day', 'year')
+YEARS = range(2000, 2061)
+
+# fraction of differing pixels above which a cell is not that digit
+MAX_MISMATCH = .15
+
+# probe table labels of the way to the panel, see `python -m
+# switchctl.calibrate`
+HOME = 'switch-home'
+SETTINGS_ICON = 'switch-settings-icon'  # the settings icon is selected
+SETTINGS = 'switch-settings'
+SYSTEM = 'switch-system'  # "System" is selected in the settings sidebar
+DATE_AND_TIME = 'switch-date-and-time'  # selected on the system page
+# the key undoing a move, for stepping back after overshooting a hold
+_BACK = {'d': 'a', 'a': 'd', 's': 'w', 'w': 's'}
+
+
+def _binarize(cell: numpy.ndarray) -> numpy.ndarray:
+    import cv2
+
+    gray = cv2.cvtColor(cell, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # the selected field is drawn inverted, make the digit the 1s either way
+    if binary.mean() > .5:
+        binary ^= 1
+    return binary
+
+
+def _cells(frame: numpy.ndarray, field: str) -> list[numpy.ndarray]:
+    return [frame[y:y + h, x:x + w] for x, y, w, h in FIELDS[field]]
+
+
+class Digits:
+    def __init__(
+            self,
+            templates: numpy.ndarray,
+            learned: numpy.ndarray,
+    ) -> None:
+        self.templates = templates
+        self.learned = learned
+
+    @classmethod
+    def empty(cls) -> Digits:
+        import numpy
+
+        _, _, w, h = FIELDS['month'][0]
+        return cls(
+            numpy.zeros((10, h, w), numpy.uint8),
+            numpy.zeros(10, bool),
+        )
+
+    @classmethod
+    def load(cls, path: str = DIGITS_DEFAULT) -> Digits:
+        import numpy
+
+        with numpy.load(path) as data:
+            return cls(data['templates'], data['learned'])
+
+    def save(self, path: str = DIGITS_DEFAULT) -> None:
+        import numpy
+
+        numpy.savez(path, templates=self.templates, learned=self.learned)
+
+    def learn(self, cell: numpy.ndarray, digit: int) -> None:
+        self.templates[digit] = _binarize(cell)
+        self.learned[digit] = True
+
+    def read(self, cell: numpy.ndarray) -> int | None:
+        binary = _binarize(cell)
+        mismatch = (self.templates != binary).mean(axis=(1, 2))
+        mismatch[~self.learned] = 1
+        best = int(mismatch.argmin())
+        if mismatch[best] > MAX_MISMATCH:
+            return None
+        else:
+            return best
+
+    def read_field(self, frame: numpy.ndarray, field: str) -> int | None:
+        value = 0
+        for cell in _cells(frame, field):
+            digit = self.read(cell)
+            if digit is None:
+                return None
+            value = value * 10 + digit
+        return value
+
+    def read_fields(self, frame: numpy.ndarray) -> dict[str, int] | None:
+        ret = {}
+        for field in ORDER:
+            value = self.read_field(frame, field)
+            if value is None:
+                return None
+            ret[field] = value
+        return ret
+
+
+def _to_date(fields: dict[str, int]) -> datetime.date | None:
+    try:
+        return datetime.date(fields['year'], fields['month'], fields['day'])
+    except ValueError:
+        return None
+
+
+def _direction(field: str, fields: dict[str, int], want: int) -> str:
+    if field == 'year':
+        return 'w' if want > fields['year'] else 's'
+
+    if field == 'month':
+        n = 12
+    else:
+        n = _days(fields['year'], fields['month'])
+    up = (want - fields[field]) % n
+    return 'w' if up <= n - up else 's'
+
+
+def _days(year: int, month: int) -> int:
+    _, n = calendar.monthrange(year, month)
+    return n
+
+
+def _field_steps(
+        field: str,
+        fields: dict[str, int],
+        want: int,
+) -> list[plan.Step]:
+    if field == 'year':
+        n = abs(want - fields['year'])
+    else:
+        if field == 'month':
+            size = 12
+        else:
+            size = _days(fields['year'], fields['month'])
+        up = (want - fields[field]) % size
+        n = min(up, size - up)
+    return [plan.Step(_direction(field, fields, want))] * n
+
+
+def _press(fields: dict[str, int], field: str, key: str) -> None:
+    # what one press does to the fields, the console clamps the day into
+    # every month it passes through
+    delta = 1 if key == 'w' else -1
+    if field == 'year':
+        fields['year'] += delta
+    else:
+        if field == 'month':
+            size = 12
+        else:
+            size = _days(fields['year'], fields['month'])
+        fields[field] = (fields[field] - 1 + delta) % size + 1
+    fields['day'] = min(fields['day'], _days(fields['year'], fields['month']))
+
+
+# the fewest presses taking the date fields from current to target, trying
+# every order of setting the fields.  every press is played through `_press`
+# and orders that don't end on the target (a day clamped on the way) are
+# skipped
+def plan_date(
+        current: datetime.date,
+        target: datetime.date,
+        *,
+        cursor: int = 0,
+) -> tuple[plan.Step, ...]:
+    if target.year not in YEARS:
+        raise ValueError(f'{target} is outside of {YEARS}')
+
+    start = {'year': current.year, 'month': current.month, 'day': current.day}
+    want = {'year': target.year, 'month': target.month, 'day': target.day}
+    # the day even when it matches, a clamp on the way can still move it
+    changed = [f for f in ORDER if start[f] != want[f] or f == 'day']
+
+    best: list[plan.Step] | None = None
+    for order in itertools.permutations(changed):
+        fields = dict(start)
+        pos = cursor
+        steps: list[plan.Step] = []
+        for field in order:
+            field_steps = _field_steps(field, fields, want[field])
+            if not field_steps:
+                continue
+
+            idx = ORDER.index(field)
+            key = 'd' if idx > pos else 'a'
+            steps.extend([plan.Step(key)] * abs(idx - pos))
+            pos = idx
+
+            for step in field_steps:
+                _press(fields, field, step.key)
+            steps.extend(field_steps)
+
+        if fields == want and (
+                best is None or plan.estimate(steps) < plan.estimate(best)
+        ):
+            best = steps
+
+    # setting the day last always lands: it only moves within the target
+    # month, whatever the clamps did to it before
+    assert best is not None
+    return tuple(best)
+
+
+# drives the date fields until the screen shows the target date, correcting
+# for dropped or doubled inputs by re-reading the digits after every press
+class DatePanel:
+    def __init__(
+            self,
+            ser: SerialLike,
+            vid: Capture,
+            digits: Digits,
+            table: dict[str, tuple[Probe, ...]],
+            *,
+            timeout: float = 5,
+    ) -> None:
+        self.ser = ser
+        self.vid = vid
+        self.digits = digits
+        self.table = table
+        self.timeout = timeout
+        self.cursor = 0
+
+    def _fields(self, timeout: float) -> dict[str, int] | None:
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            fields = self.digits.read_fields(frames.getframe(self.vid))
+            if fields is not None:
+                return fields
+        return None
+
+    def fields(self) -> dict[str, int]:
+        fields = self._fields(self.timeout)
+        if fields is None:
+            print('date panel not recognized')
+            frames.alarm(self.ser, self.vid)
+        return fields
+
+    def read(self) -> datetime.date:
+        date = _to_date(self.fields())
+        if date is None:
+            print('date panel shows an impossible date')
+            frames.alarm(self.ser, self.vid)
+        return date
+
+    def _await(self, label: str) -> None:
+        frames.await_probes(
+            self.ser, self.vid, self.table[label], timeout=self.timeout,
+        )
+
+    # holds `key` until `label` shows, stepping back when the cursor went
+    # one entry too far before the release landed
+    def _select(self, key: str, label: str) -> None:
+        probes = self.table[label]
+        for _ in range(3):
+            if all(detect.match(frames.getframe(self.vid), probes)):
+                return
+            self.ser.write(key.encode())
+            detect.await_probes(self.vid, probes, timeout=self.timeout)
+            self.ser.write(b'0')
+            frames.wait_and_render(self.vid, .25)
+            if all(detect.match(frames.getframe(self.vid), probes)):
+                return
+            inputs.press(self.ser, _BACK[key], .05)
+            frames.wait_and_render(self.vid, .25)
+        print(f'could not select {label}')
+        frames.alarm(self.ser, self.vid)
+
+    def open(self) -> None:
+        inputs.press(self.ser, 'H', .05)
+        self._await(HOME)
+
+        inputs.press(self.ser, 's', .05)
+        self._select('d', SETTINGS_ICON)
+        inputs.press(self.ser, 'A', .05)
+        self._await(SETTINGS)
+
+        self._select('s', SYSTEM)
+        inputs.press(self.ser, 'A', .05)
+        self._select('s', DATE_AND_TIME)
+        inputs.press(self.ser, 'A', .05)
+
+        # the panel opens with the cursor on the first field
+        self.cursor = 0
+        self.fields()
+
+    def _move_to(self, field: str) -> None:
+        target = ORDER.index(field)
+        while self.cursor != target:
+            key = 'd' if target > self.cursor else 'a'
+            inputs.press(self.ser, key, .05, release=.05, quiet=True)
+            self.cursor += 1 if key == 'd' else -1
+
+    def _step(self, key: str, before: dict[str, int]) -> None:
+        inputs.press(self.ser, key, .05, release=0, quiet=True)
+
+        end = time.monotonic() + .5
+        while time.monotonic() < end:
+            after = self.digits.read_fields(frames.getframe(self.vid))
+            if after is not None and after != before:
+                break
+        else:
+            return  # dropped, the caller re-reads and tries again
+
+        # a different field than expected moved: the cursor is elsewhere
+        changed = [field for field in ORDER if after[field] != before[field]]
+        if ORDER[self.cursor] not in changed:
+            self.cursor = ORDER.index(changed[0])
+
+    def set(self, target: datetime.date) -> None:
+        if target.year not in YEARS:
+            raise ValueError(f'{target} is outside of {YEARS}')
+
+        end = time.monotonic() + self.timeout * 10
+        while True:
+            fields = self.fields()
+            if _to_date(fields) == target:
+                return
+            elif time.monotonic() > end:
+                print(f'could not reach {target}')
+                frames.alarm(self.ser, self.vid)
+
+            # year and month first: they decide how many days there are
+            for field in ('year', 'month', 'day'):
+                want = getattr(target, field)
+                if fields[field] != want:
+                    break
+            self._move_to(field)
+            self._step(_direction(field, fields, want), fields)
+
+    def go_to(self, target: datetime.date) -> None:
+        steps = plan_date(self.read(), target, cursor=self.cursor)
+        plan.run(self.ser, steps)
+        self.cursor += (
+            steps.count(plan.Step('d')) - steps.count(plan.Step('a'))
+        )
+
+        # the batch is unverified, fall back to the step by step loop
+        if self.read() != target:
+            print('batched date skip missed, correcting')
+            self.set(target)
+        self.confirm()
+
+    def skip(self, days: int) -> datetime.date:
+        target = self.read() + datetime.timedelta(days=days)
+        self.go_to(target)
+        return target
+
+    def confirm(self) -> None:
+        # from the year the hold runs past the time fields onto OK, the
+        # cursor stops there at the end of the row so it can't overshoot
+        self._move_to('year')
+        for _ in range(3):
+            inputs.press(self.ser, 'd', .5)
+            inputs.press(self.ser, 'A', .05)
+            # closing the panel goes back to the system page
+            if detect.await_probes(
+                    self.vid, self.table[DATE_AND_TIME], timeout=self.timeout,
+            ):
+                return
+        print('date panel did not close')
+        frames.alarm(self.ser, self.vid)
+
+
+def return_to_game(ser: SerialLike) -> None:
+    inputs.press(ser, 'H', .05)
+    time.sleep(1)
+    inputs.press(ser, 'H', .05)
+    time.sleep(2)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--digits', default=DIGITS_DEFAULT)
+    # the date the open date panel currently shows
+    parser.add_argument('date', type=datetime.date.fromisoformat)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.digits):
+        digits = Digits.load(args.digits)
+    else:
+        digits = Digits.empty()
+
+    vid = capture.open(args.video, 1280, 720)
+    frame = frames.getframe(vid)
+    shown = {
+        'month': f'{args.date.month:02}',
+        'day': f'{args.date.day:02}',
+        'year': f'{args.date.year:04}',
+    }
+    for field, s in shown.items():
+        for cell, c in zip(_cells(frame, field), s):
+            digits.learn(cell, int(c))
+    vid.release()
+
+    digits.save(args.digits)
+    missing = [str(i) for i in range(10) if not digits.learned[i]]
+    if missing:
+        print(f'still missing digits: {", ".join(missing)}')
+    else:
+        print('all digits learned')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
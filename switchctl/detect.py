@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import concurrent.futures
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import NamedTuple
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import display
+from switchctl.capture import Capture
+
+if TYPE_CHECKING:
+    import numpy
+
+
+class Probe(NamedTuple):
+    x: int
+    y: int
+    pixel: tuple[int, int, int]
+    # squared BGR distance below which the pixel matches, 1 is exact
+    tolerance: int = 1
+
+
+class Event(NamedTuple):
+    seq: int
+    t: float
+    matched: tuple[bool, ...]
+
+
+def match(image: numpy.ndarray, probes: Sequence[Probe]) -> tuple[bool, ...]:
+    import numpy
+
+    ys = [probe.y for probe in probes]
+    xs = [probe.x for probe in probes]
+    actual = image[ys, xs].astype(numpy.int32)
+    expected = numpy.array([probe.pixel for probe in probes], numpy.int32)
+    dist = ((actual - expected) ** 2).sum(axis=1)
+    tolerance = numpy.array([probe.tolerance for probe in probes])
+    return tuple(bool(m) for m in dist < tolerance)
+
+
+def _match_one(image: numpy.ndarray, probe: Probe) -> bool:
+    b, g, r = image[probe.y, probe.x]
+    eb, eg, er = probe.pixel
+    dist = (int(b) - eb) ** 2 + (int(g) - eg) ** 2 + (int(r) - er) ** 2
+    return dist < probe.tolerance
+
+
+# per worker process: shared memory blocks already attached, by name
+_attached: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _detect(
+        shm_name: str,
+        shape: tuple[int, ...],
+        seq: int,
+        t: float,
+        probes: tuple[Probe, ...],
+) -> Event:
+    import numpy
+
+    shm = _attached.get(shm_name)
+    if shm is None:
+        shm = _attached[shm_name] = shared_memory.SharedMemory(shm_name)
+    image = numpy.ndarray(shape, numpy.uint8, buffer=shm.buf)
+    return Event(seq, t, match(image, probes))
+
+
+# feeds the newest frame of one capture to the pool, one frame in flight at a
+# time so a slow pool drops frames instead of queueing latency
+class _Feed:
+    def __init__(
+            self,
+            executor: concurrent.futures.ProcessPoolExecutor,
+            vid: Capture,
+    ) -> None:
+        self.executor = executor
+        self.vid = vid
+        self.probes: tuple[Probe, ...] = ()
+        self.event: Event | None = None
+        # bumped by every `set_probes`, results for older ones are dropped
+        # even when the probes compare equal
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._shm: shared_memory.SharedMemory | None = None
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f'detect-{vid.index}',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        import numpy
+
+        seq = -1
+        while not self._closed:
+            try:
+                frame = self.vid.next_frame(seq)
+            except TimeoutError:
+                continue
+            seq = frame.seq
+
+            with self._cond:
+                probes = self.probes
+                generation = self._generation
+            if not probes:
+                continue
+
+            if self._shm is None:
+                self._shm = shared_memory.SharedMemory(
+                    create=True,
+                    size=frame.image.nbytes,
+                )
+            shared = numpy.ndarray(
+                frame.image.shape,
+                numpy.uint8,
+                buffer=self._shm.buf,
+            )
+            shared[:] = frame.image
+
+            future = self.executor.submit(
+                _detect,
+                self._shm.name,
+                frame.image.shape,
+                frame.seq,
+                frame.t,
+                probes,
+            )
+            event = future.result()
+            with self._cond:
+                if generation == self._generation:
+                    self.event = event
+                    self._cond.notify_all()
+
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+
+    def next_event(self, after: int, timeout: float) -> Event | None:
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self.event is not None and self.event.seq > after,
+                timeout=timeout,
+            )
+            return self.event
+
+    def set_probes(self, probes: tuple[Probe, ...]) -> None:
+        with self._cond:
+            self.probes = probes
+            self._generation += 1
+            self.event = None
+
+    def close(self) -> None:
+        self._closed = True
+        self._thread.join()
+
+
+_lock = threading.Lock()
+_executor: concurrent.futures.ProcessPoolExecutor | None = None
+_feeds: dict[int, _Feed] = {}
+
+
+def start(processes: int) -> None:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # hunts are already running threads, don't fork them
+            _executor = concurrent.futures.ProcessPoolExecutor(
+                processes,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+
+def stop() -> None:
+    global _executor
+    with _lock:
+        for feed in _feeds.values():
+            feed.close()
+        _feeds.clear()
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def _feed_for(vid: Capture) -> _Feed | None:
+    with _lock:
+        if _executor is None:
+            return None
+        feed = _feeds.get(vid.index)
+        if feed is None:
+            feed = _feeds[vid.index] = _Feed(_executor, vid)
+        return feed
+
+
+def await_probes(
+        vid: Capture,
+        probes: Sequence[Probe],
+        *,
+        present: bool = True,
+        timeout: float = 90,
+) -> bool:
+    end = time.time() + timeout
+    probes = tuple(probes)
+
+    feed = _feed_for(vid)
+    if feed is None:
+        while time.time() < end:
+            _, image = vid.read()
+            display.show(image)
+            if all(_match_one(image, probe) for probe in probes) is present:
+                return True
+        return False
+
+    feed.set_probes(probes)
+    # only frames from after the call, not one the last await already saw
+    latest = vid.latest()
+    seq = -1 if latest is None else latest.seq
+    while time.time() < end:
+        event = feed.next_event(seq, timeout=.1)
+        latest = vid.latest()
+        if latest is not None:
+            display.show(latest.image)
+        if event is not None:
+            seq = event.seq
+            if all(event.matched) is present:
+                return True
+    return False
+
+
+def await_probe(
+        vid: Capture,
+        probe: Probe,
+        *,
+        present: bool = True,
+        timeout: float = 90,
+) -> bool:
+    return await_probes(vid, (probe,), present=present, timeout=timeout)
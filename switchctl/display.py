@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import collections
+import sys
+import threading
+from typing import TextIO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# what a hunt running under the orchestrator shows instead of its own window
+class Panel:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.frame: numpy.ndarray | None = None
+        self.lines: collections.deque[str] = collections.deque(maxlen=4)
+        self.stop = threading.Event()
+        self._partial = ''
+
+    def log(self, s: str) -> None:
+        self._partial += s
+        *lines, self._partial = self._partial.split('\n')
+        self.lines.extend(line for line in lines if line)
+
+
+_local = threading.local()
+_last: numpy.ndarray | None = None
+_window_ready = False
+
+
+def bind(panel: Panel) -> None:
+    _local.panel = panel
+
+
+def current() -> Panel | None:
+    return getattr(_local, 'panel', None)
+
+
+def _print_pixel(event: int, x: int, y: int, flags: int, param: object) -> None:
+    import cv2
+
+    if event == cv2.EVENT_LBUTTONDOWN and _last is not None:
+        print(f'frame[{y}][{x}] = {tuple(_last[y, x])}')
+
+
+def show(frame: numpy.ndarray) -> None:
+    global _last, _window_ready
+
+    panel = current()
+    if panel is not None:
+        panel.frame = frame
+        if panel.stop.is_set():
+            raise SystemExit(0)
+        return
+
+    import cv2
+
+    _last = frame
+    cv2.imshow('game', frame)
+    if not _window_ready:
+        # click the window to print BGR and coords for troubleshooting
+        cv2.setMouseCallback('game', _print_pixel)
+        _window_ready = True
+    if cv2.waitKey(1) & 0xFF == ord('q'):
+        raise SystemExit(0)
+
+
+class _PanelOutput:
+    def __init__(self, fallback: TextIO) -> None:
+        self.fallback = fallback
+
+    def write(self, s: str) -> int:
+        panel = current()
+        if panel is None:
+            return self.fallback.write(s)
+        else:
+            panel.log(s)
+            return len(s)
+
+    def flush(self) -> None:
+        self.fallback.flush()
+
+
+def capture_output() -> None:
+    # route print() from hunt threads to their panel
+    if not isinstance(sys.stdout, _PanelOutput):
+        sys.stdout = _PanelOutput(sys.stdout)  # type: ignore[assignment]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import time
+from typing import NoReturn
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+import switchctl.alarm
+from switchctl import detect
+from switchctl import display
+from switchctl import inputs
+from switchctl import timing
+from switchctl.capture import Capture
+from switchctl.controller import SerialLike
+
+if TYPE_CHECKING:
+    import numpy
+
+
+def getframe(vid: Capture) -> numpy.ndarray:
+    with timing.timed('getframe'):
+        _, frame = vid.read()
+        display.show(frame)
+    return frame
+
+
+def wait_and_render(vid: Capture, t: float) -> None:
+    end = time.monotonic() + t
+    while time.monotonic() < end:
+        getframe(vid)
+
+
+def alarm(
+        ser: SerialLike,
+        vid: Capture,
+        pattern: switchctl.alarm.Pattern = switchctl.alarm.PATTERNS['default'],
+) -> NoReturn:
+    switchctl.alarm.start(ser, pattern)
+    while True:
+        getframe(vid)
+
+
+def await_pixel(
+        ser: SerialLike,
+        vid: Capture,
+        *,
+        x: int,
+        y: int,
+        pixel: tuple[int, int, int],
+        timeout: float = 90,
+        pattern: switchctl.alarm.Pattern = switchctl.alarm.PATTERNS['default'],
+        mash: str | None = None,
+) -> None:
+    # `mash` taps a key the whole time, see `inputs.mash`
+    probe = detect.Probe(x, y, pixel)
+    if mash is None:
+        found = detect.await_probe(vid, probe, timeout=timeout)
+    else:
+        with inputs.mash(ser, mash):
+            found = detect.await_probe(vid, probe, timeout=timeout)
+    if not found:
+        alarm(ser, vid, pattern)
+
+
+def await_not_pixel(
+        ser: SerialLike,
+        vid: Capture,
+        *,
+        x: int,
+        y: int,
+        pixel: tuple[int, int, int],
+        timeout: float = 90,
+        pattern: switchctl.alarm.Pattern = switchctl.alarm.PATTERNS['default'],
+) -> None:
+    probe = detect.Probe(x, y, pixel)
+    if not detect.await_probe(vid, probe, present=False, timeout=timeout):
+        alarm(ser, vid, pattern)
+
+
+def await_probes(
+        ser: SerialLike,
+        vid: Capture,
+        probes: Sequence[detect.Probe],
+        *,
+        present: bool = True,
+        timeout: float = 90,
+        mash: str | None = None,
+) -> None:
+    if mash is None:
+        found = detect.await_probes(
+            vid, probes, present=present, timeout=timeout,
+        )
+    else:
+        with inputs.mash(ser, mash):
+            found = detect.await_probes(
+                vid, probes, present=present, timeout=timeout,
+            )
+    if not found:
+        alarm(ser, vid)
+
+
+def color_near(
+        pixel: numpy.ndarray,
+        expected: tuple[int, int, int],
+        tolerance: int = 76,
+) -> bool:
+    # python ints: uint8 pixel components would wrap when subtracted
+    b, g, r = expected
+    return (
+        (int(pixel[0]) - b) ** 2 +
+        (int(pixel[1]) - g) ** 2 +
+        (int(pixel[2]) - r) ** 2
+    ) < tolerance
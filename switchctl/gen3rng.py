@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from typing import NamedTuple
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
+
+# the gen 3 linear congruential rng, one advance per frame in frlg
+MULT = 0x41C64E6D
+ADD = 0x6073
+FPS = 59.7275  # gba frames per second
+
+NATURES = (
+    'hardy', 'lonely', 'brave', 'adamant', 'naughty',
+    'bold', 'docile', 'relaxed', 'impish', 'lax',
+    'timid', 'hasty', 'serious', 'jolly', 'naive',
+    'modest', 'mild', 'quiet', 'bashful', 'rash',
+    'calm', 'gentle', 'sassy', 'careful', 'quirky',
+)
+# in the order `pack_ivs` takes them
+STATS = ('hp', 'atk', 'def', 'spa', 'spd', 'spe')
+
+
+def pack_ivs(ivs: Sequence[int]) -> int:
+    # the two 15 bit halves method 1 draws: hp / atk / def then spe / spa / spd
+    hp, atk, def_, spa, spd, spe = ivs
+    return (
+        hp | atk << 5 | def_ << 10 |
+        (spe | spa << 5 | spd << 10) << 15
+    )
+
+
+def unpack_ivs(packed: int) -> tuple[int, ...]:
+    hp, atk, def_, spe, spa, spd = (packed >> i & 31 for i in range(0, 30, 5))
+    return (hp, atk, def_, spa, spd, spe)
+
+
+def parse_iv_list(s: str) -> tuple[int, ...]:
+    ivs = tuple(int(part) for part in s.split('/'))
+    if len(ivs) != 6 or not all(0 <= iv <= 31 for iv in ivs):
+        raise ValueError(f'expected six ivs like 31/20/15/31/8/3, got {s!r}')
+    return ivs
+
+
+def parse_ivs(s: str) -> int:
+    return pack_ivs(parse_iv_list(s))
+
+
+def _jump(n: int) -> tuple[int, int]:
+    # (mult, add) of `n` advances in one step, by squaring the single advance
+    mult, add = 1, 0
+    step_mult, step_add = MULT, ADD
+    while n:
+        if n & 1:
+            mult = mult * step_mult & 0xFFFFFFFF
+            add = (add * step_mult + step_add) & 0xFFFFFFFF
+        step_add = step_add * (step_mult + 1) & 0xFFFFFFFF
+        step_mult = step_mult * step_mult & 0xFFFFFFFF
+        n >>= 1
+    return mult, add
+
+
+def states(seed: int, start: int, count: int) -> numpy.ndarray:
+    import numpy
+
+    # the state after `start` .. `start + count - 1` advances.  each pass
+    # doubles the filled part with the jump of its own length, so this takes
+    # log2(count) vector operations instead of a python loop per frame
+    mult, add = _jump(start)
+    out = numpy.empty(count, numpy.uint32)
+    out[0] = (seed * mult + add) & 0xFFFFFFFF
+    n = 1
+    while n < count:
+        m = min(n, count - n)
+        mult, add = _jump(n)
+        out[n:n + m] = out[:m] * numpy.uint32(mult) + numpy.uint32(add)
+        n *= 2
+    return out
+
+
+def method1(
+        seed: int,
+        start: int,
+        count: int,
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    # (pids, packed ivs) of the pokemon generated on each frame
+    import numpy
+
+    high = states(seed, start + 1, count + 3) >> 16
+    pids = high[:count] | high[1:count + 1] << numpy.uint32(16)
+    ivs = (
+        (high[2:count + 2] & numpy.uint32(0x7FFF)) |
+        (high[3:count + 3] & numpy.uint32(0x7FFF)) << numpy.uint32(15)
+    )
+    return pids, ivs
+
+
+class Hit(NamedTuple):
+    seed_ms: int  # when the title screen was passed to get this seed
+    seed: int
+    frame: int
+    pid: int
+    ivs: int
+
+    @property
+    def nature(self) -> str:
+        return NATURES[self.pid % 25]
+
+    @property
+    def delay(self) -> float:
+        # seconds from the seed to this frame
+        return self.frame / FPS
+
+    def __str__(self) -> str:
+        ivs = '/'.join(str(iv) for iv in unpack_ivs(self.ivs))
+        return (
+            f'seed {self.seed:04X} ({self.seed_ms}ms) '
+            f'frame {self.frame} ({self.delay:.3f}s): '
+            f'{self.nature} {ivs} pid {self.pid:08X}'
+        )
+
+
+def _fill(
+        pids: numpy.ndarray,
+        ivs: numpy.ndarray,
+        seed: int,
+        start: int,
+        *,
+        chunk: int = 1 << 20,
+) -> None:
+    # a chunk at a time so millions of frames don't need their states at once
+    for offset in range(0, len(pids), chunk):
+        count = min(chunk, len(pids) - offset)
+        pid, iv = method1(seed, start + offset, count)
+        pids[offset:offset + count] = pid
+        ivs[offset:offset + count] = iv
+
+
+def _index(
+        pids: numpy.ndarray,
+        ivs: numpy.ndarray,
+) -> tuple[numpy.ndarray, numpy.ndarray]:
+    import numpy
+
+    keys = _key(ivs.ravel(), pids.ravel() % numpy.uint32(25))
+    order = numpy.argsort(keys, kind='stable')
+    return keys[order], order.astype(numpy.min_scalar_type(keys.size))
+
+
+# method 1 results of the frames `start` .. `start + count - 1` of several
+# seeds, with an index sorted by (ivs, nature) so an observed result is looked
+# up instead of searched for.  saved as .npy files that load memory mapped,
+# so even tables of millions of frames per seed open instantly
+class FrameTable:
+    def __init__(
+            self,
+            seeds: numpy.ndarray,
+            start: int,
+            pids: numpy.ndarray,
+            ivs: numpy.ndarray,
+            keys: numpy.ndarray,
+            order: numpy.ndarray,
+    ) -> None:
+        self.seeds = seeds  # (seeds, 2): ms, seed
+        self.start = start
+        self.pids = pids  # (seeds, frames)
+        self.ivs = ivs
+        self._keys = keys
+        self._order = order
+
+    @property
+    def count(self) -> int:
+        return self.pids.shape[1]
+
+    @classmethod
+    def build(
+            cls,
+            seeds: Sequence[tuple[int, int]],
+            start: int,
+            count: int,
+    ) -> FrameTable:
+        import numpy
+
+        pids = numpy.empty((len(seeds), count), numpy.uint32)
+        ivs = numpy.empty((len(seeds), count), numpy.uint32)
+        for row, (_, seed) in enumerate(seeds):
+            _fill(pids[row], ivs[row], seed, start)
+        return cls(
+            numpy.array(seeds, numpy.int64),
+            start,
+            pids,
+            ivs,
+            *_index(pids, ivs),
+        )
+
+    @classmethod
+    def generate(
+            cls,
+            path: str,
+            seeds: Sequence[tuple[int, int]],
+            start: int,
+            count: int,
+    ) -> FrameTable:
+        import numpy
+        from numpy.lib.format import open_memmap
+
+        # written straight into the files, the table never has to fit in ram
+        os.makedirs(path, exist_ok=True)
+        shape = (len(seeds), count)
+        pids = open_memmap(_file(path, 'pids'), 'w+', numpy.uint32, shape)
+        ivs = open_memmap(_file(path, 'ivs'), 'w+', numpy.uint32, shape)
+        for row, (ms, seed) in enumerate(seeds):
+            print(f'seed {seed:04X} ({ms}ms)')
+            _fill(pids[row], ivs[row], seed, start)
+        pids.flush()
+        ivs.flush()
+
+        keys, order = _index(pids, ivs)
+        numpy.save(_file(path, 'keys'), keys)
+        numpy.save(_file(path, 'order'), order)
+        numpy.save(_file(path, 'seeds'), numpy.array(seeds, numpy.int64))
+        with open(os.path.join(path, 'table.json'), 'w') as f:
+            json.dump({'start': start, 'count': count}, f)
+            f.write('\n')
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: str) -> FrameTable:
+        import numpy
+
+        with open(os.path.join(path, 'table.json')) as f:
+            meta = json.load(f)
+        return cls(
+            numpy.load(_file(path, 'seeds')),
+            meta['start'],
+            *(
+                numpy.load(_file(path, name), mmap_mode='r')
+                for name in ('pids', 'ivs', 'keys', 'order')
+            ),
+        )
+
+    def _hit(self, i: int) -> Hit:
+        row, col = divmod(int(i), self.count)
+        return Hit(
+            int(self.seeds[row, 0]),
+            int(self.seeds[row, 1]),
+            self.start + col,
+            int(self.pids[row, col]),
+            int(self.ivs[row, col]),
+        )
+
+    def lookup(self, nature: str, ivs: int | None = None) -> list[Hit]:
+        import numpy
+
+        n = NATURES.index(nature)
+        if ivs is None:
+            # a nature alone matches every ~25th frame, no use sorting for it
+            found = numpy.flatnonzero(self.pids % numpy.uint32(25) == n)
+        else:
+            key = _key(numpy.uint32(ivs), numpy.uint32(n))
+            lo = numpy.searchsorted(self._keys, key, side='left')
+            hi = numpy.searchsorted(self._keys, key, side='right')
+            found = self._order[lo:hi]
+        return [self._hit(i) for i in found]
+
+    # frames matching every filter given, earliest first per seed.  `tsv` is
+    # the trainer id xor the secret id, for shiny frames only
+    def query(
+            self,
+            *,
+            natures: Sequence[str] = (),
+            min_ivs: Sequence[int] = (0,) * 6,
+            max_ivs: Sequence[int] = (31,) * 6,
+            tsv: int | None = None,
+            limit: int = 20,
+    ) -> list[Hit]:
+        import numpy
+
+        hits: list[Hit] = []
+        for row in range(len(self.seeds)):
+            pids, ivs = self.pids[row], self.ivs[row]
+            mask = numpy.ones(self.count, bool)
+            if natures:
+                wanted = [NATURES.index(nature) for nature in natures]
+                mask &= numpy.isin(pids % numpy.uint32(25), wanted)
+            for shift, lo, hi in zip(_SHIFTS, min_ivs, max_ivs):
+                if lo > 0 or hi < 31:
+                    iv = ivs >> numpy.uint32(shift) & numpy.uint32(31)
+                    mask &= (iv >= lo) & (iv <= hi)
+            if tsv is not None:
+                high = pids >> numpy.uint32(16)
+                low = pids & numpy.uint32(0xFFFF)
+                mask &= (high ^ low ^ numpy.uint32(tsv)) < 8
+            for col in numpy.flatnonzero(mask)[:limit - len(hits)]:
+                hits.append(self._hit(row * self.count + col))
+            if len(hits) >= limit:
+                break
+        return hits
+
+
+# bit offset of each of `STATS` in packed ivs
+_SHIFTS = (0, 5, 10, 20, 25, 15)
+
+
+def _file(path: str, name: str) -> str:
+    return os.path.join(path, f'{name}.npy')
+
+
+def _key(ivs: numpy.ndarray, natures: numpy.ndarray) -> numpy.ndarray:
+    import numpy
+
+    return ivs.astype(numpy.uint64) << numpy.uint64(5) | natures
+
+
+def parse_seed(s: str) -> tuple[int, int]:
+    # `MS:SEED` as given by a seed calculator, e.g. 30842:5A0B
+    ms, _, seed = s.partition(':')
+    return int(ms), int(seed, 16)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build')
+    build_parser.add_argument('path')
+    build_parser.add_argument(
+        '--seed', action='append', type=parse_seed, required=True,
+    )
+    build_parser.add_argument('--start', type=int, default=0)
+    build_parser.add_argument('--count', type=int, default=1_000_000)
+
+    query_parser = subparsers.add_parser('query')
+    query_parser.add_argument('path')
+    query_parser.add_argument('--nature', action='append', default=[])
+    # inclusive, as hp/atk/def/spa/spd/spe
+    query_parser.add_argument('--min-ivs', type=parse_iv_list)
+    query_parser.add_argument('--max-ivs', type=parse_iv_list)
+    query_parser.add_argument('--tid', type=int)
+    query_parser.add_argument('--sid', type=int)
+    query_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        t0 = time.monotonic()
+        table = FrameTable.generate(
+            args.path, args.seed, args.start, args.count,
+        )
+        print(f'{table.pids.size} frames in {time.monotonic() - t0:.1f}s')
+        return 0
+
+    if (args.tid is None) != (args.sid is None):
+        query_parser.error('--tid and --sid go together')
+    unknown = set(args.nature) - set(NATURES)
+    if unknown:
+        query_parser.error(f'unknown natures: {", ".join(sorted(unknown))}')
+
+    table = FrameTable.load(args.path)
+    t0 = time.monotonic()
+    hits = table.query(
+        natures=args.nature,
+        min_ivs=args.min_ivs or (0,) * 6,
+        max_ivs=args.max_ivs or (31,) * 6,
+        tsv=None if args.tid is None else args.tid ^ args.sid,
+        limit=args.limit,
+    )
+    for hit in hits:
+        print(hit)
+    print(f'{len(hits)} hits in {(time.monotonic() - t0) * 1000:.0f}ms')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from typing import Generator
+
+from switchctl import timing
+from switchctl.controller import SerialLike
+
+
+def press(
+        ser: SerialLike,
+        s: str,
+        duration: float = .1,
+        *,
+        release: float = .075,
+        quiet: bool = False,
+) -> None:
+    if not quiet:
+        print(f'{s=} {duration=}')
+    with timing.timed('press'):
+        ser.write(s.encode())
+        time.sleep(duration)
+        ser.write(b'0')
+        time.sleep(release)
+
+
+@contextlib.contextmanager
+def shh(ser: SerialLike) -> Generator[None, None, None]:
+    try:
+        yield
+    finally:
+        ser.write(b'.')
+
+
+# taps `s` on a background thread until the block exits, so a key gets
+# pressed within a couple of frames of the screen accepting it while the
+# caller is busy watching for whatever comes next.  about 3 taps a second,
+# faster only queues up presses the game is not reading yet
+@contextlib.contextmanager
+def mash(
+        ser: SerialLike,
+        s: str,
+        *,
+        duration: float = .1,
+        release: float = .2,
+) -> Generator[None, None, None]:
+    stop = threading.Event()
+
+    def _run() -> None:
+        while not stop.is_set():
+            ser.write(s.encode())
+            stop.wait(duration)
+            ser.write(b'0')
+            stop.wait(release)
+
+    thread = threading.Thread(target=_run, name=f'mash-{s}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,317 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import shlex
+import smtplib
+import ssl
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from email.message import EmailMessage
+from types import TracebackType
+from typing import NamedTuple
+from typing import Protocol
+
+
+class Message(NamedTuple):
+    subject: str
+    body: str
+
+
+class Backend(Protocol):
+    name: str
+
+    def send(self, msg: Message) -> None: ...
+    def close(self) -> None: ...
+
+
+class SMTPBackend:
+    name = 'smtp'
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            *,
+            sender: str,
+            receiver: str,
+            user: str | None = None,
+            password: str | None = None,
+            use_ssl: bool = True,
+            timeout: float = 10,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.receiver = receiver
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp: smtplib.SMTP
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(
+                self.host,
+                self.port,
+                timeout=self.timeout,
+                context=ssl.create_default_context(),
+            )
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.user is not None and self.password is not None:
+            smtp.login(self.user, self.password)
+        return smtp
+
+    def send(self, msg: Message) -> None:
+        em = EmailMessage()
+        em['From'] = self.sender
+        em['To'] = self.receiver
+        em['Subject'] = msg.subject
+        em.set_content(msg.body)
+
+        # reuse the connection, the server may have dropped it while idle.
+        # a reset or timed out socket is an OSError, not an SMTPException
+        if self._smtp is not None:
+            try:
+                self._smtp.noop()
+            except (OSError, smtplib.SMTPException):
+                self.close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+
+        try:
+            self._smtp.send_message(em)
+        except (OSError, smtplib.SMTPException):
+            # the retry connects again instead of reusing a dead socket
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (OSError, smtplib.SMTPException):
+                pass
+            self._smtp = None
+
+
+class WebhookBackend:
+    name = 'webhook'
+
+    def __init__(self, url: str, *, timeout: float = 10) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, msg: Message) -> None:
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(msg._asdict()).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        urllib.request.urlopen(req, timeout=self.timeout).close()
+
+    def close(self) -> None:
+        pass
+
+
+class FileBackend:
+    name = 'file'
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def send(self, msg: Message) -> None:
+        with open(self.path, 'a+') as f:
+            f.write(f'{time.ctime()}: {msg.subject}: {msg.body}\n')
+
+    def close(self) -> None:
+        pass
+
+
+class CommandBackend:
+    name = 'command'
+
+    def __init__(self, cmd: list[str], *, timeout: float = 30) -> None:
+        self.cmd = cmd
+        self.timeout = timeout
+
+    def send(self, msg: Message) -> None:
+        subprocess.run(
+            (*self.cmd, msg.subject, msg.body),
+            check=True,
+            timeout=self.timeout,
+        )
+
+    def close(self) -> None:
+        pass
+
+
+class _Worker:
+    def __init__(
+            self,
+            backend: Backend,
+            *,
+            retries: int,
+            backoff: float,
+            min_interval: float,
+    ) -> None:
+        self.backend = backend
+        self.retries = retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.queue: queue.Queue[Message | None] = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run,
+            name=f'notify-{backend.name}',
+            daemon=True,
+        )
+        self.thread.start()
+
+    def _deliver(self, msg: Message) -> None:
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                self.backend.send(msg)
+            except Exception as e:
+                print(
+                    f'notify[{self.backend.name}]: attempt {attempt + 1} '
+                    f'failed: {e!r}',
+                    file=sys.stderr,
+                )
+                if attempt != self.retries:
+                    time.sleep(delay)
+                    delay *= 2
+            else:
+                return
+        print(
+            f'notify[{self.backend.name}]: dropped {msg.subject!r}',
+            file=sys.stderr,
+        )
+
+    def _run(self) -> None:
+        last = float('-inf')
+        while True:
+            msg = self.queue.get()
+            if msg is None:
+                break
+
+            # rate limit: anything queued while we wait is sent as one batch
+            time.sleep(max(0, last + self.min_interval - time.monotonic()))
+            pending = [msg]
+            while True:
+                try:
+                    more = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self.queue.put(None)
+                    break
+                pending.append(more)
+
+            if len(pending) > 1:
+                msg = Message(
+                    f'{pending[0].subject} (+{len(pending) - 1} more)',
+                    '\n\n'.join(m.body for m in pending),
+                )
+            self._deliver(msg)
+            last = time.monotonic()
+
+        self.backend.close()
+
+
+class Notifier:
+    def __init__(
+            self,
+            backends: list[Backend],
+            *,
+            retries: int = 5,
+            backoff: float = 2,
+            min_interval: float = 30,
+    ) -> None:
+        self._workers = [
+            _Worker(
+                backend,
+                retries=retries,
+                backoff=backoff,
+                min_interval=min_interval,
+            )
+            for backend in backends
+        ]
+
+    def send(self, subject: str, body: str) -> None:
+        print(f'notify: {subject}')
+        for worker in self._workers:
+            worker.queue.put_nowait(Message(subject, body))
+
+    def close(self, timeout: float = 10) -> None:
+        for worker in self._workers:
+            worker.queue.put(None)
+        end = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.thread.join(max(0, end - time.monotonic()))
+
+    def __enter__(self) -> Notifier:
+        return self
+
+    def __exit__(
+            self,
+            exc_type: type[BaseException] | None,
+            exc_value: BaseException | None,
+            traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def from_env() -> Notifier:
+    backends: list[Backend] = []
+
+    sender = os.environ.get('email_sender')
+    receiver = os.environ.get('email_receiver')
+    if sender and receiver:
+        backends.append(
+            SMTPBackend(
+                os.environ.get('smtp_host', 'smtp.gmail.com'),
+                int(os.environ.get('smtp_port', '465')),
+                sender=sender,
+                receiver=receiver,
+                user=os.environ.get('smtp_user', sender),
+                password=os.environ.get('email_password'),
+                use_ssl=os.environ.get('smtp_ssl', '1') == '1',
+            ),
+        )
+    if os.environ.get('notify_webhook'):
+        backends.append(WebhookBackend(os.environ['notify_webhook']))
+    if os.environ.get('notify_file'):
+        backends.append(FileBackend(os.environ['notify_file']))
+    if os.environ.get('notify_command'):
+        backends.append(
+            CommandBackend(shlex.split(os.environ['notify_command'])),
+        )
+
+    return Notifier(backends)
+
+
+def main() -> int:
+    # try a configuration without a hunt, for example against a local
+    # server: `python -m aiosmtpd -n -l localhost:1025` (pip install
+    # aiosmtpd) with smtp_host=localhost smtp_port=1025 smtp_ssl=0
+    parser = argparse.ArgumentParser()
+    parser.add_argument('subject', nargs='?', default='test notification')
+    parser.add_argument('body', nargs='?', default='hello hello world')
+    args = parser.parse_args()
+
+    with from_env() as notifier:
+        notifier.send(args.subject, args.body)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import math
+import threading
+import traceback
+from typing import Any
+from typing import NamedTuple
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import detect
+from switchctl import display
+
+if TYPE_CHECKING:
+    import numpy
+
+# example config:
+# {
+#     "consoles": [
+#         {
+#             "name": "regi",
+#             "script": "scripts.swsh.regi_reset",
+#             "serial": "/dev/ttyUSB0",
+#             "video": 0,
+#             "params": {"sigma": 4}
+#         }
+#     ]
+# }
+
+
+class ConsoleConfig(NamedTuple):
+    name: str
+    script: str
+    serial: str
+    video: int
+    params: dict[str, Any]
+
+    @property
+    def argv(self) -> list[str]:
+        ret = ['--serial', self.serial, '--video', str(self.video)]
+        for k, v in self.params.items():
+            opt = f'--{k.replace("_", "-")}'
+            if v is True:
+                ret.append(opt)
+            elif v is not False and v is not None:
+                ret.extend((opt, str(v)))
+        return ret
+
+
+def load_config(path: str) -> list[ConsoleConfig]:
+    with open(path) as f:
+        contents = json.load(f)
+
+    return [
+        ConsoleConfig(
+            name=console.get('name', f'console {i}'),
+            script=console['script'],
+            serial=console['serial'],
+            video=console['video'],
+            params=console.get('params', {}),
+        )
+        for i, console in enumerate(contents['consoles'])
+    ]
+
+
+def _run(cfg: ConsoleConfig, panel: display.Panel) -> None:
+    display.bind(panel)
+    try:
+        mod = importlib.import_module(cfg.script)
+        ret = mod.main(cfg.argv)
+    except SystemExit as e:
+        ret = e.code
+    except BaseException:
+        for line in traceback.format_exc().splitlines():
+            panel.log(f'{line}\n')
+        ret = 1
+    panel.log(f'exited ({ret})\n')
+
+
+def _tile(
+        panel: display.Panel,
+        alive: bool,
+        width: int,
+        height: int,
+) -> numpy.ndarray:
+    import cv2
+    import numpy
+
+    line_h = 18
+    ret = numpy.zeros((height + line_h * 5, width, 3), dtype=numpy.uint8)
+    if panel.frame is not None:
+        ret[:height] = cv2.resize(panel.frame, (width, height))
+
+    lines = [f'{panel.name}{"" if alive else " (stopped)"}', *panel.lines]
+    for i, line in enumerate(lines):
+        cv2.putText(
+            ret,
+            line[:width // 8],
+            (4, height + line_h * (i + 1) - 4),
+            cv2.FONT_HERSHEY_PLAIN,
+            1,
+            (255, 255, 255) if i else (0, 255, 255),
+        )
+    return ret
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('config')
+    parser.add_argument('--tile-width', type=int, default=480)
+    parser.add_argument('--detect-processes', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    import cv2
+    import numpy
+
+    consoles = load_config(args.config)
+    panels = [display.Panel(cfg.name) for cfg in consoles]
+    threads = [
+        threading.Thread(
+            target=_run,
+            args=(cfg, panel),
+            name=f'hunt-{cfg.name}',
+            daemon=True,
+        )
+        for cfg, panel in zip(consoles, panels)
+    ]
+
+    if args.detect_processes:
+        detect.start(args.detect_processes)
+
+    display.capture_output()
+    for thread in threads:
+        thread.start()
+
+    width = args.tile_width
+    height = width * 9 // 16
+    cols = math.ceil(math.sqrt(len(panels)))
+    rows = math.ceil(len(panels) / cols)
+
+    while any(thread.is_alive() for thread in threads):
+        tiles = [
+            _tile(panel, thread.is_alive(), width, height)
+            for panel, thread in zip(panels, threads)
+        ]
+        blank = numpy.zeros_like(tiles[0])
+        tiles.extend(blank for _ in range(rows * cols - len(tiles)))
+        grid = numpy.vstack([
+            numpy.hstack(tiles[row * cols:(row + 1) * cols])
+            for row in range(rows)
+        ])
+        cv2.imshow('dashboard', grid)
+        if cv2.waitKey(33) & 0xFF == ord('q'):
+            for panel in panels:
+                panel.stop.set()
+            for thread in threads:
+                thread.join(5)
+            break
+
+    detect.stop()
+    cv2.destroyAllWindows()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
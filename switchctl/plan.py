@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import NamedTuple
+from typing import Sequence
+
+from switchctl.controller import SerialLike
+
+
+class Step(NamedTuple):
+    key: str  # empty for a plain wait
+    duration: float = .05
+    release: float = .05
+
+
+def wait(seconds: float) -> Step:
+    return Step('', 0, seconds)
+
+
+def estimate(plan: Sequence[Step]) -> float:
+    return sum(step.duration + step.release for step in plan)
+
+
+def presses(plan: Sequence[Step]) -> int:
+    return sum(1 for step in plan if step.key)
+
+
+def run(ser: SerialLike, plan: Sequence[Step]) -> None:
+    # sleep against absolute deadlines so per-step overhead doesn't add up
+    t = time.monotonic()
+    for step in plan:
+        if step.key:
+            ser.write(step.key.encode())
+            t += step.duration
+            time.sleep(max(t - time.monotonic(), 0))
+            ser.write(b'0')
+        t += step.release
+        time.sleep(max(t - time.monotonic(), 0))
+
+
+def report(sections: Sequence[tuple[str, Sequence[Step]]]) -> str:
+    lines = [
+        f'{name}: {presses(steps)} presses, {estimate(steps):.1f}s'
+        for name, steps in sections
+    ]
+    total = [step for _, steps in sections for step in steps]
+    lines.append(
+        f'total: {presses(total)} presses, '
+        f'{estimate(total) / 60:.1f} minutes',
+    )
+    return '\n'.join(lines)
+
+
+def emit(path: str, sections: Sequence[tuple[str, Sequence[Step]]]) -> None:
+    contents = [
+        {'name': name, 'steps': [step._asdict() for step in steps]}
+        for name, steps in sections
+    ]
+    with open(path, 'w') as f:
+        json.dump(contents, f, indent=2)
+        f.write('\n')
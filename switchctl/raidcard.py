@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import argparse
+import os
+from typing import NamedTuple
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import capture
+from switchctl import frames
+
+if TYPE_CHECKING:
+    import numpy
+
+TEMPLATES_DEFAULT = 'raid_templates.npz'
+
+# regions of the den card of a 1280x720 capture, (x, y, w, h)
+MENU_PIXEL = ((881, 457), (16, 16, 16))  # (x, y), bgr
+# the fifth star, only lit on 5 star dens.  the other stars are not measured
+# so fewer stars are not told apart
+FIFTH_STAR = (315, 61)
+TYPE_ROIS = ((50, 105, 40, 20), (196, 105, 40, 20))
+POKEMON_ROI = (800, 160, 360, 400)
+
+# how far a region may be from its best template and still match
+TYPE_MAX_DIFF = 24  # mean absolute bgr difference
+POKEMON_MAX_MISMATCH = .1  # fraction of differing silhouette pixels
+
+
+class RaidCard(NamedTuple):
+    five_star: bool
+    types: tuple[str | None, str | None]
+    pokemon: str | None
+
+
+class Query(NamedTuple):
+    five_star: bool = False
+    types: frozenset[str] = frozenset()
+    pokemon: str | None = None
+
+    def matches(self, card: RaidCard) -> bool:
+        return (
+            (not self.five_star or card.five_star) and
+            self.types <= set(card.types) and
+            (self.pokemon is None or card.pokemon == self.pokemon)
+        )
+
+
+def _crop(
+        frame: numpy.ndarray,
+        roi: tuple[int, int, int, int],
+) -> numpy.ndarray:
+    x, y, w, h = roi
+    return frame[y:y + h, x:x + w]
+
+
+def _silhouette(frame: numpy.ndarray) -> numpy.ndarray:
+    import cv2
+
+    gray = cv2.cvtColor(_crop(frame, POKEMON_ROI), cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+
+def menu_open(frame: numpy.ndarray) -> bool:
+    (x, y), pixel = MENU_PIXEL
+    return frames.color_near(frame[y, x], pixel, tolerance=1)
+
+
+class Templates:
+    def __init__(
+            self,
+            types: dict[str, numpy.ndarray],
+            pokemon: dict[str, numpy.ndarray],
+    ) -> None:
+        self.types = types
+        self.pokemon = pokemon
+
+    @classmethod
+    def load(cls, path: str = TEMPLATES_DEFAULT) -> Templates:
+        import numpy
+
+        types, pokemon = {}, {}
+        if os.path.exists(path):
+            with numpy.load(path) as data:
+                for key in data.files:
+                    kind, _, name = key.partition(':')
+                    if kind == 'type':
+                        types[name] = data[key]
+                    else:
+                        pokemon[name] = data[key]
+        return cls(types, pokemon)
+
+    def save(self, path: str = TEMPLATES_DEFAULT) -> None:
+        import numpy
+
+        numpy.savez(
+            path,
+            **{f'type:{k}': v for k, v in self.types.items()},
+            **{f'pokemon:{k}': v for k, v in self.pokemon.items()},
+        )
+
+    def _type(
+            self,
+            frame: numpy.ndarray,
+            roi: tuple[int, int, int, int],
+    ) -> str | None:
+        import numpy
+
+        crop = _crop(frame, roi).astype(numpy.int16)
+        best, best_diff = None, TYPE_MAX_DIFF
+        for name, template in self.types.items():
+            diff = numpy.abs(crop - template).mean()
+            if diff < best_diff:
+                best, best_diff = name, diff
+        return best
+
+    def _pokemon(self, frame: numpy.ndarray) -> str | None:
+        silhouette = _silhouette(frame)
+        best, best_mismatch = None, POKEMON_MAX_MISMATCH
+        for name, template in self.pokemon.items():
+            mismatch = (silhouette != template).mean()
+            if mismatch < best_mismatch:
+                best, best_mismatch = name, mismatch
+        return best
+
+    def read(self, frame: numpy.ndarray) -> RaidCard:
+        x, y = FIFTH_STAR
+        five_star = all(c >= 210 for c in frame[y, x])
+        type1, type2 = (self._type(frame, roi) for roi in TYPE_ROIS)
+        return RaidCard(five_star, (type1, type2), self._pokemon(frame))
+
+    def learn(
+            self,
+            frame: numpy.ndarray,
+            *,
+            types: Sequence[str | None],
+            pokemon: str | None,
+    ) -> None:
+        import numpy
+
+        for name, roi in zip(types, TYPE_ROIS):
+            if name is not None:
+                self.types[name] = _crop(frame, roi).astype(numpy.int16)
+        if pokemon is not None:
+            self.pokemon[pokemon] = _silhouette(frame)
+
+
+def add_query_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--five-star', action='store_true')
+    parser.add_argument('--type', action='append', default=[], dest='types')
+    parser.add_argument('--pokemon')
+
+
+def query_from_args(args: argparse.Namespace) -> Query:
+    return Query(args.five_star, frozenset(args.types), args.pokemon)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--templates', default=TEMPLATES_DEFAULT)
+    # what the open den card shows, teaches the templates
+    parser.add_argument('--type1')
+    parser.add_argument('--type2')
+    parser.add_argument('--pokemon')
+    args = parser.parse_args(argv)
+
+    templates = Templates.load(args.templates)
+
+    vid = capture.open(args.video, 1280, 720)
+    frame = frames.getframe(vid)
+    vid.release()
+
+    if not menu_open(frame):
+        print('no den card on screen')
+        return 1
+
+    templates.learn(
+        frame,
+        types=(args.type1, args.type2),
+        pokemon=args.pokemon,
+    )
+    templates.save(args.templates)
+    print(templates.read(frame))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Sequence
+
+from switchctl import detect
+from switchctl import timing
+from switchctl.capture import Capture
+from switchctl.capture import Frame
+from switchctl.controller import Controller
+from switchctl.detect import Probe
+
+
+# presses `key` from the capture thread on the first frame matching `probes`,
+# for windows too short to wait on the frame to come back around to the
+# caller.  only the probe pixels are looked at and the press is written
+# straight away, the release goes through the controller's scheduler
+class Reflex:
+    def __init__(
+            self,
+            vid: Capture,
+            controller: Controller,
+            probes: Sequence[Probe],
+            key: str,
+            *,
+            duration: float = .1,
+    ) -> None:
+        self.vid = vid
+        self.controller = controller
+        self.probes = tuple(probes)
+        self.data = key.encode()
+        self.duration = duration
+        # frame timestamp to serial write of the last press
+        self.latency: float | None = None
+        self._armed = False
+        self._done = threading.Event()
+
+    def _hook(self, frame: Frame) -> None:
+        if not self._armed or not all(detect.match(frame.image, self.probes)):
+            return
+        self.controller.write(self.data)
+        self.latency = time.monotonic() - frame.t
+        self._armed = False
+        self.controller.call_later(self.duration, self._release)
+
+    def _release(self) -> None:
+        self.controller.write(b'0')
+        self._done.set()
+
+    def arm(self) -> None:
+        self.latency = None
+        self._done.clear()
+        self._armed = True
+        self.vid.add_hook(self._hook)
+
+    def disarm(self) -> None:
+        self._armed = False
+        self.vid.remove_hook(self._hook)
+
+    # true once the press went out and was released again
+    def wait(self, timeout: float) -> bool:
+        if not self._done.wait(timeout):
+            return False
+        self.disarm()
+        assert self.latency is not None
+        timing.record('reflex', self.latency)
+        return True
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import NamedTuple
+
+STATS_DEFAULT = 'shiny_stats.json'
+LOG_DEFAULT = 'delays.log'
+
+# below this the estimate is dominated by frame timing, not by the game
+MIN_STD = .02
+
+
+class DelayStats(NamedTuple):
+    n: int = 0
+    mean: float = 0.
+    m2: float = 0.
+
+    @property
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.
+        else:
+            return math.sqrt(self.m2 / (self.n - 1))
+
+    def add(self, x: float) -> DelayStats:
+        # welford's online update
+        n = self.n + 1
+        delta = x - self.mean
+        mean = self.mean + delta / n
+        return DelayStats(n, mean, self.m2 + delta * (x - mean))
+
+
+def _load_all(path: str) -> dict[str, DelayStats]:
+    try:
+        with open(path) as f:
+            contents = json.load(f)
+    except FileNotFoundError:
+        return {}
+    else:
+        return {k: DelayStats(*v) for k, v in contents.items()}
+
+
+def _save_all(path: str, stats: dict[str, DelayStats]) -> None:
+    # a tmp file of its own, the stats file is shared between hunts
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=f'{os.path.basename(path)}.',
+        suffix='.tmp',
+    )
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump({k: list(v) for k, v in stats.items()}, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+# hunts running side by side (`switchctl.orchestrate`) share the stats and
+# log files, each update re-reads the stats so no key's update is lost
+_lock = threading.Lock()
+
+
+def _update(path: str, key: str, stats: DelayStats) -> None:
+    with _lock:
+        all_stats = _load_all(path)
+        all_stats[key] = stats
+        _save_all(path, all_stats)
+
+
+class DelayClassifier:
+    def __init__(
+            self,
+            key: str,
+            *,
+            threshold: float,
+            sigma: float = 5,
+            calibrate_after: int = 50,
+            stats_file: str = STATS_DEFAULT,
+            log_file: str | None = LOG_DEFAULT,
+    ) -> None:
+        self.key = key
+        self.threshold = threshold
+        self.sigma = sigma
+        self.calibrate_after = calibrate_after
+        self.stats_file = stats_file
+        self.log_file = log_file
+        self.stats = _load_all(stats_file).get(key, DelayStats())
+
+    @property
+    def calibrated(self) -> bool:
+        return self.stats.n >= self.calibrate_after
+
+    @property
+    def cutoff(self) -> float:
+        if not self.calibrated:
+            return self.threshold
+        else:
+            std = max(self.stats.std, MIN_STD)
+            return self.stats.mean + self.sigma * std
+
+    def is_shiny(self, delay: float) -> bool:
+        shiny = delay > self.cutoff
+
+        if self.log_file is not None:
+            line = f'{time.time():.3f} {self.key} {delay:.3f} {int(shiny)}\n'
+            with _lock, open(self.log_file, 'a+') as f:
+                f.write(line)
+
+        # outliers are not fed back so one shiny can't widen the window
+        if not shiny:
+            self.stats = self.stats.add(delay)
+            _update(self.stats_file, self.key, self.stats)
+
+        print(
+            f'{self.key}: {delay:.3f}s (cutoff {self.cutoff:.3f}s, '
+            f'n={self.stats.n} mean={self.stats.mean:.3f} '
+            f'std={self.stats.std:.3f})',
+        )
+        return shiny
+
+
+def capture_key(script: str, video: int, width: int, height: int) -> str:
+    return f'{script}@{video}:{width}x{height}'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('log', nargs='?', default=LOG_DEFAULT)
+    parser.add_argument('--rebuild', metavar='STATS_FILE')
+    args = parser.parse_args()
+
+    samples: dict[str, list[float]] = collections.defaultdict(list)
+    with open(args.log) as f:
+        for line in f:
+            _, key, delay_s, shiny_s = line.split()
+            if shiny_s == '0':
+                samples[key].append(float(delay_s))
+
+    rebuilt = {}
+    for key, delays in sorted(samples.items()):
+        stats = DelayStats()
+        for delay in delays:
+            stats = stats.add(delay)
+        rebuilt[key] = stats
+
+        delays.sort()
+        p50 = delays[len(delays) // 2]
+        p99 = delays[min(len(delays) - 1, int(len(delays) * .99))]
+        print(
+            f'{key}: n={stats.n} mean={stats.mean:.3f} std={stats.std:.3f} '
+            f'p50={p50:.3f} p99={p99:.3f} max={delays[-1]:.3f}',
+        )
+
+    if args.rebuild:
+        _save_all(args.rebuild, rebuilt)
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Sequence
+from typing import TYPE_CHECKING
+
+from switchctl import capture
+from switchctl import frames
+from switchctl import inputs
+from switchctl.capture import Capture
+from switchctl.controller import SerialLike
+
+if TYPE_CHECKING:
+    import numpy
+
+REFERENCES_DEFAULT = 'sprites.npz'
+
+# the pokemon sprite on the summary page of a 768x480 capture, (x, y, w, h)
+SPRITE_ROI = (470, 90, 220, 220)
+BINS = 8  # per channel
+# L1 distance between histograms: the summary moved on from the previous
+# pokemon, and the sprite stopped fading in
+CHANGED = .1
+SETTLED = .02
+
+
+def histogram(frame: numpy.ndarray) -> numpy.ndarray:
+    import numpy
+
+    x, y, w, h = SPRITE_ROI
+    quantized = frame[y:y + h, x:x + w] // (256 // BINS)
+    b, g, r = quantized[..., 0], quantized[..., 1], quantized[..., 2]
+    index = (b.astype(numpy.int32) * BINS + g) * BINS + r
+    counts = numpy.bincount(index.ravel(), minlength=BINS ** 3)
+    return counts / counts.sum()
+
+
+class References:
+    def __init__(self, hists: dict[str, numpy.ndarray]) -> None:
+        self.hists = hists
+
+    @classmethod
+    def load(cls, path: str = REFERENCES_DEFAULT) -> References:
+        import numpy
+
+        if not os.path.exists(path):
+            return cls({})
+        with numpy.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def save(self, path: str = REFERENCES_DEFAULT) -> None:
+        import numpy
+
+        numpy.savez(path, **self.hists)
+
+    def learn(self, species: str, shiny: bool, hist: numpy.ndarray) -> None:
+        self.hists[f'{species}:{"shiny" if shiny else "normal"}'] = hist
+
+    # (n, bins) histograms to (n,) booleans, the nearest reference wins
+    def is_shiny(self, species: str, hists: numpy.ndarray) -> numpy.ndarray:
+        import numpy
+
+        try:
+            refs = numpy.stack((
+                self.hists[f'{species}:normal'],
+                self.hists[f'{species}:shiny'],
+            ))
+        except KeyError:
+            raise KeyError(f'no normal and shiny reference for {species}')
+        # L1 distance of every histogram to both references at once
+        dist = numpy.abs(hists[:, None, :] - refs[None, :, :]).sum(axis=-1)
+        return dist.argmin(axis=1) == 1
+
+
+def _changed(
+        vid: Capture,
+        prev: numpy.ndarray,
+        *,
+        timeout: float = 1,
+) -> bool:
+    import numpy
+
+    # even the same sprite again goes away in the page transition
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        hist = histogram(frames.getframe(vid))
+        if numpy.abs(hist - prev).sum() > CHANGED:
+            return True
+    return False
+
+
+def _settled(vid: Capture, *, timeout: float = .75) -> numpy.ndarray:
+    import numpy
+
+    # the sprite fades in, take it once two frames in a row agree
+    prev = hist = histogram(frames.getframe(vid))
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        hist = histogram(frames.getframe(vid))
+        if numpy.abs(hist - prev).sum() < SETTLED:
+            break
+        prev = hist
+    return hist
+
+
+# histograms of `count` pokemon, starting with the one under the box cursor
+def scan(ser: SerialLike, vid: Capture, count: int) -> numpy.ndarray:
+    import numpy
+
+    # open the summary, up / down then walks through the box
+    inputs.press(ser, 'A', .05, quiet=True)
+    frames.wait_and_render(vid, .5)
+    inputs.press(ser, 'A', .05, quiet=True)
+    frames.wait_and_render(vid, 1.5)
+
+    hists = []
+    for i in range(count):
+        if i:
+            inputs.press(ser, 's', .05, release=0, quiet=True)
+            # settling on the previous sprite would check it twice
+            if not _changed(vid, hists[-1]):
+                print(f'summary of #{i + 1} did not show up')
+                frames.alarm(ser, vid)
+        hists.append(_settled(vid))
+
+    inputs.press(ser, 'B', .05, quiet=True)
+    frames.wait_and_render(vid, 1)
+    return numpy.stack(hists)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--video', type=int, default=0)
+    parser.add_argument('--references', default=REFERENCES_DEFAULT)
+    parser.add_argument('--shiny', action='store_true')
+    # with a summary page open, remember its sprite as the reference
+    parser.add_argument('species')
+    args = parser.parse_args(argv)
+
+    refs = References.load(args.references)
+    vid = capture.open(args.video, 768, 480)
+    refs.learn(args.species, args.shiny, histogram(frames.getframe(vid)))
+    vid.release()
+    refs.save(args.references)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import atexit
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+from typing import Generator
+
+_lock = threading.Lock()
+_counts: collections.Counter[str] = collections.Counter()
+_totals: collections.Counter[str] = collections.Counter()
+_maxes: dict[str, float] = {}
+
+
+def record(name: str, elapsed: float) -> None:
+    with _lock:
+        _counts[name] += 1
+        _totals[name] += elapsed
+        _maxes[name] = max(_maxes.get(name, 0), elapsed)
+
+
+@contextlib.contextmanager
+def timed(name: str) -> Generator[None, None, None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+
+def report() -> str:
+    with _lock:
+        return '\n'.join(
+            f'{name}: n={n} '
+            f'mean={_totals[name] / n * 1000:.2f}ms '
+            f'max={_maxes[name] * 1000:.2f}ms '
+            f'total={_totals[name]:.2f}s'
+            for name, n in sorted(_counts.items())
+        )
+
+
+def _report_at_exit() -> None:
+    if _counts:
+        print(report(), file=sys.stderr)
+
+
+if os.environ.get('switchctl_timing') == '1':
+    atexit.register(_report_at_exit)